@@ -0,0 +1,117 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+offline animation renderer, without any display
+
+every frame of an animation is the same mesh transformed by its own
+matrix of a precalculated table, like Models3D.get_rot_matrix returns,
+so frames are independent of each other and are rendered by a pool
+of worker processes
+
+mesh, camera and the matrix table are sent to every worker only once,
+at pool start, for every frame only its index is sent to a worker and
+the finished PPM image is sent back, images are written in frame order
+"""
+
+import os
+import sys
+import multiprocessing
+from array import array
+# own modules
+import Models3D
+import Rasterizer3D
+from Mesh3D import Mesh3D as Mesh3D
+from Matrix3D import Matrix3D as Matrix3D
+from Vector3D import Vector3D as Vector3D
+from Camera3D import Camera3D as Camera3D
+from VertexArray import VertexArray as VertexArray
+
+FILENAME = "frame%04d.ppm"
+
+# in worker processes, set once by _init_worker
+_job = None
+
+def _init_worker(job):
+    """
+    pool initializer, rebuild mesh and matrices once per worker
+    job is the dictionary built by render_animation
+    """
+    global _job
+    job = dict(job)
+    job["mesh"] = Mesh3D.from_indexed(VertexArray(job["data"]), job["indices"], job["offsets"])
+    job["transformations"] = [Matrix3D([list(row) for row in rows]) for rows in job["transformations"]]
+    _job = job
+
+def _render_frame(index):
+    """worker function, return tuple (index, PPM image of frame index)"""
+    job = _job
+    framebuffer = Rasterizer3D.FrameBuffer(job["width"], job["height"], job["background"])
+    mesh = job["mesh"].transform(job["transformations"][index])
+    Rasterizer3D.render_mesh(framebuffer, mesh, job["camera"], job["color"], job["light"])
+    return (index, framebuffer.to_ppm())
+
+def render_animation(mesh, transformations, directory, width=320, height=180, camera=None, color=(255, 255, 255), light=None, background=(0, 0, 0), processes=None, filename=FILENAME):
+    """
+    render one frame for every Matrix3D in transformations,
+    and write them as PPM images to directory, named filename % frame index
+
+    camera defaults to a camera covering width x height pixels,
+    processes defaults to number of cpus, with 1 process
+    everything is rendered in this process
+    returns list of written filenames, in frame order
+    """
+    if camera is None:
+        camera = Camera3D((0, 0), viewport=(width / 2.0, height / 2.0))
+    vertices = mesh.vertices
+    job = {
+        # plain arrays, buffers of cached meshes may not be picklable
+        "data": array("d", vertices.data),
+        "indices": array("i", mesh.indices),
+        "offsets": array("i", mesh.offsets),
+        "transformations": [tuple((tuple(matrix[row]) for row in range(4))) for matrix in transformations],
+        "width": width,
+        "height": height,
+        "camera": camera,
+        "color": color,
+        "light": light,
+        "background": background,
+    }
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    filenames = []
+    processes = processes or multiprocessing.cpu_count()
+    if processes == 1:
+        _init_worker(job)
+        frames = (_render_frame(index) for index in range(len(transformations)))
+        pool = None
+    else:
+        pool = multiprocessing.Pool(processes, _init_worker, (job, ))
+        # imap returns in order, while later frames are already rendered
+        frames = pool.imap(_render_frame, range(len(transformations)))
+    try:
+        for (index, image) in frames:
+            path = os.path.join(directory, filename % index)
+            with open(path, "wb") as outfile:
+                outfile.write(image)
+            filenames.append(path)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return filenames
+
+def get_turntable(steps=360, distance=16.0):
+    """
+    return matrix table for one full turn around Y-Axis in steps frames,
+    slightly tilted, at distance in front of the camera
+    """
+    static = Matrix3D.get_shift_matrix(0, 0, distance).dot(Matrix3D.get_rot_x_matrix(0.4))
+    return Models3D.get_rot_matrix(static, (0.0, 360.0 / steps, 0.0), steps)
+
+
+if __name__ == "__main__":
+    # render a turntable of the cube, python Animation3D.py directory [frames]
+    directory = sys.argv[1] if len(sys.argv) > 1 else "frames"
+    steps = int(sys.argv[2]) if len(sys.argv) > 2 else 360
+    light = Vector3D(0.0, 0.0, -1.0, 1.0)
+    render_animation(Models3D.get_cube_mesh(), get_turntable(steps), directory, light=light)
@@ -0,0 +1,236 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from array import array
+# own modules
+import Backend3D
+
+# maximum number of triangles in one leaf node
+LEAF_SIZE = 4
+# rays nearly parallel to a triangle are ignored
+EPSILON = 1e-12
+
+class BVH3D(object):
+    """
+    bounding volume hierarchy over the faces of a Mesh3D,
+    to find the face hit by a ray in O(log faces) instead of O(faces)
+
+    faces are split into triangles (fans around first vertex),
+    the tree is built by median split along the longest axis
+
+    all nodes are stored in flat arrays, no node objects
+    node_bounds : array("d"), min x, y, z, max x, y, z per node
+    node_child  : array("i"), index of first child, second child follows,
+                  -1 for leaf nodes
+    node_start  : array("i"), leaf nodes only, first entry in triangle order
+    node_count  : array("i"), leaf nodes only, number of triangles
+    """
+
+    def __init__(self, mesh, leaf_size=LEAF_SIZE):
+        """build hierarchy for Mesh3D, vertices are read only once"""
+        vertices = mesh.vertices
+        # python floats, not numpy scalars, for the loops over vertices
+        self.data = Backend3D.as_array(vertices) if Backend3D.is_numpy(vertices) else vertices.data
+        self.leaf_size = leaf_size
+        self.__triangulate(mesh)
+        self.__build()
+
+    def __triangulate(self, mesh):
+        """split faces in triangles, remember face of every triangle"""
+        triangles = array("i")
+        triangle_faces = array("i")
+        indices = mesh.indices
+        offsets = mesh.offsets
+        for face_index in range(len(mesh)):
+            start = offsets[face_index]
+            for offset in range(start + 1, offsets[face_index + 1] - 1):
+                triangles.extend((indices[start], indices[offset], indices[offset + 1]))
+                triangle_faces.append(face_index)
+        self.triangles = triangles
+        self.triangle_faces = triangle_faces
+
+    def __build(self):
+        """build tree top down, without recursion"""
+        data = self.data
+        triangles = self.triangles
+        len_triangles = len(self.triangle_faces)
+        # bounds and centroid of every triangle
+        tri_bounds = array("d")
+        centroids = array("d")
+        for triangle in range(len_triangles):
+            index0 = 4 * triangles[3 * triangle]
+            index1 = 4 * triangles[3 * triangle + 1]
+            index2 = 4 * triangles[3 * triangle + 2]
+            for axis in range(3):
+                value0 = data[index0 + axis]
+                value1 = data[index1 + axis]
+                value2 = data[index2 + axis]
+                tri_bounds.append(min(value0, value1, value2))
+                centroids.append((value0 + value1 + value2) / 3.0)
+            for axis in range(3):
+                tri_bounds.append(max(data[index0 + axis], data[index1 + axis], data[index2 + axis]))
+        self.order = order = array("i", range(len_triangles))
+        self.node_bounds = node_bounds = array("d")
+        self.node_child = node_child = array("i")
+        self.node_start = node_start = array("i")
+        self.node_count = node_count = array("i")
+        # add root node, stack holds (node, start, stop)
+        for target in (node_child, node_start, node_count):
+            target.append(0)
+        node_bounds.extend((0.0, ) * 6)
+        stack = [(0, 0, len_triangles)]
+        while stack:
+            (node, start, stop) = stack.pop()
+            # bounds of node
+            bounds = [float("inf")] * 3 + [float("-inf")] * 3
+            for triangle in order[start:stop]:
+                offset = 6 * triangle
+                for axis in range(3):
+                    if tri_bounds[offset + axis] < bounds[axis]:
+                        bounds[axis] = tri_bounds[offset + axis]
+                    if tri_bounds[offset + 3 + axis] > bounds[3 + axis]:
+                        bounds[3 + axis] = tri_bounds[offset + 3 + axis]
+            node_bounds[6 * node:6 * node + 6] = array("d", bounds)
+            if stop - start <= self.leaf_size:
+                node_child[node] = -1
+                node_start[node] = start
+                node_count[node] = stop - start
+                continue
+            # median split along longest axis
+            extent = [bounds[3 + axis] - bounds[axis] for axis in range(3)]
+            axis = extent.index(max(extent))
+            order[start:stop] = array("i", sorted(order[start:stop], key=lambda triangle: centroids[3 * triangle + axis]))
+            middle = (start + stop) // 2
+            child = len(node_child)
+            for target in (node_child, node_start, node_count):
+                target.extend((0, 0))
+            node_bounds.extend((0.0, ) * 12)
+            node_child[node] = child
+            stack.append((child, start, middle))
+            stack.append((child + 1, middle, stop))
+
+    def __len__(self):
+        """number of nodes"""
+        return len(self.node_child)
+
+    def get_triangle_indices(self, triangle):
+        """return the three mesh vertex indices of triangle"""
+        return tuple(self.triangles[3 * triangle:3 * triangle + 3])
+
+    def __hit_box(self, node, origin, inverse, t_max):
+        """
+        slab test of ray against bounds of node
+        return distance of entry point, or None if missed
+        """
+        bounds = self.node_bounds
+        offset = 6 * node
+        t_near = 0.0
+        for axis in range(3):
+            t_1 = (bounds[offset + axis] - origin[axis]) * inverse[axis]
+            t_2 = (bounds[offset + 3 + axis] - origin[axis]) * inverse[axis]
+            if t_1 > t_2:
+                (t_1, t_2) = (t_2, t_1)
+            if t_1 > t_near:
+                t_near = t_1
+            if t_2 < t_max:
+                t_max = t_2
+            if t_near > t_max:
+                return None
+        return t_near
+
+    def __hit_triangle(self, triangle, origin, direction):
+        """
+        Moeller-Trumbore ray triangle intersection
+        return tuple (t, u, v) or None if missed
+        """
+        data = self.data
+        index0 = 4 * self.triangles[3 * triangle]
+        index1 = 4 * self.triangles[3 * triangle + 1]
+        index2 = 4 * self.triangles[3 * triangle + 2]
+        (p0_x, p0_y, p0_z) = (data[index0], data[index0 + 1], data[index0 + 2])
+        e1_x = data[index1] - p0_x
+        e1_y = data[index1 + 1] - p0_y
+        e1_z = data[index1 + 2] - p0_z
+        e2_x = data[index2] - p0_x
+        e2_y = data[index2 + 1] - p0_y
+        e2_z = data[index2 + 2] - p0_z
+        (d_x, d_y, d_z) = direction
+        p_x = d_y * e2_z - d_z * e2_y
+        p_y = d_z * e2_x - d_x * e2_z
+        p_z = d_x * e2_y - d_y * e2_x
+        det = e1_x * p_x + e1_y * p_y + e1_z * p_z
+        if -EPSILON < det < EPSILON:
+            return None
+        inverse_det = 1.0 / det
+        s_x = origin[0] - p0_x
+        s_y = origin[1] - p0_y
+        s_z = origin[2] - p0_z
+        u = (s_x * p_x + s_y * p_y + s_z * p_z) * inverse_det
+        if u < 0.0 or u > 1.0:
+            return None
+        q_x = s_y * e1_z - s_z * e1_y
+        q_y = s_z * e1_x - s_x * e1_z
+        q_z = s_x * e1_y - s_y * e1_x
+        v = (d_x * q_x + d_y * q_y + d_z * q_z) * inverse_det
+        if v < 0.0 or u + v > 1.0:
+            return None
+        t = (e2_x * q_x + e2_y * q_y + e2_z * q_z) * inverse_det
+        if t <= EPSILON:
+            return None
+        return (t, u, v)
+
+    def intersect(self, origin, direction):
+        """
+        find nearest face hit by ray origin + t * direction, t > 0
+
+        origin and direction are Vector3D objects or tuples (x, y, z)
+        returns tuple (face_index, triangle, t, u, v) or None if nothing
+        was hit, u and v are the barycentric coordinates of the hit point
+        in triangle, see get_triangle_indices, hit point is
+        (1 - u - v) * vertex0 + u * vertex1 + v * vertex2
+        """
+        origin = (origin[0], origin[1], origin[2])
+        direction = (direction[0], direction[1], direction[2])
+        inverse = tuple((1.0 / value if value != 0.0 else float("inf") for value in direction))
+        node_child = self.node_child
+        best = None
+        t_best = float("inf")
+        if not len(self.triangle_faces) or self.__hit_box(0, origin, inverse, t_best) is None:
+            return None
+        # stack holds (node, distance of entry point)
+        stack = [(0, 0.0)]
+        while stack:
+            (node, t_node) = stack.pop()
+            if t_node > t_best:
+                # something nearer was found meanwhile
+                continue
+            child = node_child[node]
+            if child == -1:
+                start = self.node_start[node]
+                for triangle in self.order[start:start + self.node_count[node]]:
+                    hit = self.__hit_triangle(triangle, origin, direction)
+                    if hit is not None and hit[0] < t_best:
+                        t_best = hit[0]
+                        best = (self.triangle_faces[triangle], triangle) + hit
+                continue
+            t_1 = self.__hit_box(child, origin, inverse, t_best)
+            t_2 = self.__hit_box(child + 1, origin, inverse, t_best)
+            # visit nearer child first, so push it last
+            if t_1 is not None and t_2 is not None:
+                if t_1 < t_2:
+                    stack.extend(((child + 1, t_2), (child, t_1)))
+                else:
+                    stack.extend(((child, t_1), (child + 1, t_2)))
+            elif t_1 is not None:
+                stack.append((child, t_1))
+            elif t_2 is not None:
+                stack.append((child + 1, t_2))
+        return best
+
+    def pick(self, camera, screen_x, screen_y):
+        """
+        find nearest face under screen coordinates,
+        see Camera3D.get_ray and intersect
+        """
+        (origin, direction) = camera.get_ray(screen_x, screen_y)
+        return self.intersect(origin, direction)
@@ -0,0 +1,373 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+selectable backend for bulk vertex operations
+
+python : vertices in array.array("d") buffers, pure python loops,
+         this is the default and needs nothing but the standard library
+numpy  : vertices of every new Mesh3D are stored in a numpy array of
+         shape (N, 4), transformations, face normals, projection and
+         culling run as vectorised array operations
+
+the backend is chosen at import by environment variable PY3D_BACKEND,
+or at runtime by set_backend, it applies to meshes created afterwards
+
+the public API is the same for both backends, vectorised operations
+calculate every value with the same floating point operations in the
+same order as the python loops, including the multiplications left out
+by the specialised kernels of Kernels3D, so results are identical too
+"""
+
+import os
+from array import array
+try:
+    import numpy
+except ImportError:
+    numpy = None
+# own modules
+import Kernels3D
+from Vector3D import Vector3D as Vector3D
+from VertexArray import VertexArray as VertexArray
+
+BACKENDS = ("python", "numpy")
+ENV_BACKEND = "PY3D_BACKEND"
+
+BACKEND = "python"
+
+def set_backend(name):
+    """
+    select backend by name, one of BACKENDS
+    raises ValueError for unknown backends and
+    ImportError if numpy is requested but not installed
+    """
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError("unknown backend %r, use one of %s" % (name, ", ".join(BACKENDS)))
+    if name == "numpy" and numpy is None:
+        raise ImportError("backend numpy needs numpy installed")
+    BACKEND = name
+
+def get_backend():
+    """return name of selected backend"""
+    return BACKEND
+
+def is_numpy(vertices):
+    """True if vertices is a VertexArray of the numpy backend"""
+    return isinstance(vertices, NumpyVertexArray)
+
+def vertex_array(vertices):
+    """
+    return vertices, a VertexArray of any backend, as VertexArray
+    of the selected backend, vertices are copied only if necessary
+    """
+    if BACKEND == "numpy":
+        if not isinstance(vertices, NumpyVertexArray):
+            vertices = NumpyVertexArray.from_buffer(vertices.data)
+    elif isinstance(vertices, NumpyVertexArray):
+        vertices = VertexArray(as_array(vertices))
+    return vertices
+
+def as_array(vertices):
+    """
+    return x, y, z, h of VertexArray of any backend as new flat
+    array("d"), arrays and numpy arrays are copied as a whole,
+    not float by float
+    """
+    if isinstance(vertices, NumpyVertexArray):
+        return array("d", vertices.values.tobytes())
+    data = vertices.data
+    if isinstance(data, array) and data.typecode == "d":
+        return data[:]
+    return array("d", data)
+
+def as_indices(indices):
+    """return index buffer, like Mesh3D.indices, as numpy array"""
+    if isinstance(indices, array) and indices.typecode == "i":
+        # no copy
+        return numpy.frombuffer(indices, dtype=numpy.intc) if indices else numpy.zeros(0, dtype=numpy.intc)
+    return numpy.asarray(indices, dtype=numpy.intp)
+
+
+class NumpyVertexArray(VertexArray):
+    """
+    VertexArray of the numpy backend
+
+    values is a numpy array of shape (N, 4), one row x, y, z, h per vertex,
+    data is the same memory as flat view, like VertexArray.data
+    """
+
+    def __init__(self, values=None):
+        """values is a numpy array of shape (N, 4), defaults to empty"""
+        if values is None:
+            values = numpy.zeros((0, 4))
+        assert values.ndim == 2 and values.shape[1] == 4
+        self.values = numpy.ascontiguousarray(values, dtype=numpy.float64)
+
+    @property
+    def data(self):
+        """flat view of values, x, y, z, h, x, y, z, h, ..."""
+        return self.values.reshape(-1)
+
+    @classmethod
+    def from_buffer(cls, data):
+        """create class from flat buffer of x, y, z, h floats, data is copied"""
+        assert len(data) % 4 == 0
+        if not len(data):
+            return cls()
+        try:
+            values = numpy.frombuffer(data, dtype=numpy.float64)
+        except (TypeError, ValueError):
+            values = numpy.array(list(data), dtype=numpy.float64)
+        return cls(values.reshape(-1, 4).copy())
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        """create class from iterable of Vector3D objects"""
+        return cls(numpy.array([(vector[0], vector[1], vector[2], vector[3]) for vector in vectors], dtype=numpy.float64).reshape(-1, 4))
+
+    @classmethod
+    def zeros(cls, length):
+        """return preallocated NumpyVertexArray of length vertices, all zero"""
+        return cls(numpy.zeros((length, 4)))
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return NumpyVertexArray(self.values[key].copy())
+        return Vector3D(*self.values[key].tolist())
+
+    def __setitem__(self, key, vector):
+        self.values[key] = (vector[0], vector[1], vector[2], vector[3])
+
+    def __iter__(self):
+        for row in self.values.tolist():
+            yield Vector3D(*row)
+
+    def append(self, vector):
+        self.values = numpy.vstack((self.values, ((vector[0], vector[1], vector[2], vector[3]), )))
+
+    def extend(self, vectors):
+        if isinstance(vectors, NumpyVertexArray):
+            other = vectors.values
+        else:
+            other = NumpyVertexArray.from_vectors(vectors).values
+        self.values = numpy.vstack((self.values, other))
+
+    def take(self, indices):
+        return NumpyVertexArray(self.values[as_indices(indices)])
+
+    def copy(self):
+        return NumpyVertexArray(self.values.copy())
+
+    def transform(self, matrix):
+        return NumpyVertexArray(transform(self.values, matrix))
+
+    def transform_inplace(self, matrix):
+        self.values[:] = transform(self.values, matrix)
+        return self
+
+
+def transform(values, matrix, known=None):
+    """
+    return new array of shape (N, 4), every row of values
+    multiplied by Matrix3D, row for row like Matrix3D.v_dot
+
+    known is a dictionary (row, col) -> value of coefficients known to
+    be 0 or 1, these are left out like in Kernels3D, it defaults to the
+    known coefficients of the kind of matrix, so results are the same
+    as of Matrix3D.transform_into, also for zeros and infinite values,
+    use {} to multiply all coefficients, like Camera3D does
+    """
+    if known is None:
+        known = Kernels3D.KNOWN[matrix.get_kind()]
+    columns = (values[:, 0], values[:, 1], values[:, 2], values[:, 3])
+    ret_values = numpy.empty_like(values)
+    # infinite values give nan or inf silently, like python floats
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        for row in range(4):
+            result = None
+            for col in range(4):
+                if (row, col) in known:
+                    value = known[(row, col)]
+                    if value == 0.0:
+                        continue
+                    term = columns[col] if value == 1.0 else value * columns[col]
+                else:
+                    term = matrix[row][col] * columns[col]
+                result = term if result is None else result + term
+            ret_values[:, row] = 0.0 if result is None else result
+    return ret_values
+
+def get_face_normals(values, indices, offsets):
+    """
+    return array of shape (len_faces, 3) of face normals, not normalized,
+    like Mesh3D.get_face_normals
+    """
+    indices = as_indices(indices)
+    starts = as_indices(offsets)[:-1]
+    vertex0 = values[indices[starts]]
+    normals = numpy.empty((len(starts), 3))
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        v1 = vertex0 - values[indices[starts + 1]]
+        v2 = vertex0 - values[indices[starts + 2]]
+        normals[:, 0] = v1[:, 1] * v2[:, 2] - v1[:, 2] * v2[:, 1]
+        normals[:, 1] = v1[:, 2] * v2[:, 0] - v1[:, 0] * v2[:, 2]
+        normals[:, 2] = v1[:, 0] * v2[:, 1] - v1[:, 1] * v2[:, 0]
+    return normals
+
+def get_vertex_normals(values, indices, offsets):
+    """
+    return tuple (area_normals, vertex_normals) of arrays of shape
+    (len_faces, 3) and (len_vertices, 3), like the python loops
+    of Mesh3D.get_vertex_normals, same sums in the same order
+    """
+    indices = as_indices(indices)
+    offsets = as_indices(offsets)
+    (starts, stops) = (offsets[:-1], offsets[1:])
+    lengths = stops - starts
+    # previous vertex of every position, last vertex for first position
+    previous = numpy.arange(len(indices)) - 1
+    previous[starts[lengths > 0]] = stops[lengths > 0] - 1
+    vertex1 = values[indices[previous]]
+    vertex2 = values[indices]
+    area_normals = numpy.zeros((len(starts), 3))
+    vertex_sums = numpy.zeros((len(values), 3))
+    with numpy.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        terms = numpy.empty((len(indices), 3))
+        terms[:, 0] = vertex1[:, 1] * vertex2[:, 2] - vertex1[:, 2] * vertex2[:, 1]
+        terms[:, 1] = vertex1[:, 2] * vertex2[:, 0] - vertex1[:, 0] * vertex2[:, 2]
+        terms[:, 2] = vertex1[:, 0] * vertex2[:, 1] - vertex1[:, 1] * vertex2[:, 0]
+        # one step per vertex of the biggest face, in vertex order
+        for position in range(lengths.max() if len(lengths) else 0):
+            selected = lengths > position
+            area_normals[selected] += terms[starts[selected] + position]
+        # ufunc.at adds in order of indices, like a loop over all faces
+        numpy.add.at(vertex_sums, indices, numpy.repeat(area_normals, lengths, axis=0))
+        lengths = numpy.sqrt(vertex_sums[:, 0] * vertex_sums[:, 0] + vertex_sums[:, 1] * vertex_sums[:, 1] + vertex_sums[:, 2] * vertex_sums[:, 2])
+        vertex_normals = vertex_sums / lengths[:, numpy.newaxis]
+    vertex_normals[lengths == 0.0] = 0.0
+    return (area_normals, vertex_normals)
+
+def get_facing(values, indices, offsets, eye):
+    """
+    return boolean array, True for every face facing to eye,
+    like Mesh3D.cull_backfaces
+    """
+    normals = get_face_normals(values, indices, offsets)
+    vertex0 = values[as_indices(indices)[as_indices(offsets)[:-1]]]
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        return normals[:, 0] * (eye[0] - vertex0[:, 0]) + normals[:, 1] * (eye[1] - vertex0[:, 1]) + normals[:, 2] * (eye[2] - vertex0[:, 2]) > 0
+
+def get_depth_keys(values, indices, offsets, row):
+    """
+    return array of depth keys, one for every face, like
+    Mesh3D.get_depth_keys, row is tuple (x, y, z, h) of the
+    depth row of the matrix, vertices of every face are summed
+    in vertex order, like the python loop
+    """
+    indices = as_indices(indices)
+    offsets = as_indices(offsets)
+    starts = offsets[:-1]
+    lengths = offsets[1:] - starts
+    sums = numpy.zeros((len(starts), 4))
+    (row_x, row_y, row_z, row_h) = row
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        # one step per vertex of the biggest face, like get_vertex_normals
+        for position in range(lengths.max() if len(lengths) else 0):
+            selected = lengths > position
+            sums[selected] += values[indices[starts[selected] + position]]
+        return (row_x * sums[:, 0] + row_y * sums[:, 1] + row_z * sums[:, 2] + row_h * sums[:, 3]) / lengths
+
+def get_bounds(values):
+    """
+    return tuple (minimum, maximum) of lists x, y, z,
+    like BoundingBox3D.from_vertices
+    """
+    assert len(values) > 0
+    return (values[:, :3].min(axis=0).tolist(), values[:, :3].max(axis=0).tolist())
+
+def get_radius_sqrd(values, center):
+    """
+    return biggest squared distance of rows of values to tuple
+    center (x, y, z), like BoundingSphere3D.from_vertices
+    """
+    (center_x, center_y, center_z) = center
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        distances_sqrd = (values[:, 0] - center_x) ** 2 + (values[:, 1] - center_y) ** 2 + (values[:, 2] - center_z) ** 2
+    # fmax skips nan, like the comparison in the python loop
+    return float(numpy.fmax.reduce(distances_sqrd, initial=0.0))
+
+def get_outcodes(values, matrix, bits):
+    """
+    return int array of outcodes, like Camera3D.get_outcodes
+    bits is tuple of OUT_LEFT, OUT_RIGHT, OUT_BOTTOM, OUT_TOP, OUT_NEAR, OUT_FAR
+    """
+    clip = transform(values, matrix, {})
+    clip_w = clip[:, 3]
+    outcodes = numpy.zeros(len(values), dtype=numpy.intc)
+    for axis in range(3):
+        (low, high) = bits[2 * axis:2 * axis + 2]
+        outcodes |= numpy.where(clip[:, axis] < -clip_w, low, numpy.where(clip[:, axis] > clip_w, high, 0)).astype(numpy.intc)
+    return outcodes
+
+def get_outside(values, indices, offsets, matrix, bits):
+    """
+    return boolean array, True for every face entirely outside the view
+    frustum, like Mesh3D.cull_frustum, faces need at least one vertex
+    """
+    outcodes = get_outcodes(values, matrix, bits)
+    indices = as_indices(indices)
+    if not len(indices):
+        return numpy.zeros(0, dtype=bool)
+    return numpy.bitwise_and.reduceat(outcodes[indices], as_indices(offsets)[:-1]) != 0
+
+def select(face_indices, mask):
+    """
+    return list of face indices, where mask is True
+    face_indices defaults to all faces
+    """
+    if face_indices is None:
+        return numpy.flatnonzero(mask).tolist()
+    face_indices = numpy.asarray(face_indices, dtype=numpy.intp)
+    return face_indices[mask[face_indices]].tolist()
+
+def project(values, matrix, center, viewport, depth=False):
+    """
+    project rows of values to 2D screen coordinates,
+    return list of tuples (x, y) like Camera3D.project_many, or
+    with depth, list of tuples (x, y, inverse_depth) like
+    Camera3D.project_many_depth
+
+    like the python loops, without depth ZeroDivisionError is raised
+    for vertices with projected z of 0, with depth these vertices get
+    (center_x, center_y, 0.0)
+    """
+    (center_x, center_y) = center
+    (view_x, view_y) = viewport
+    (x, y, z, h) = (values[:, 0], values[:, 1], values[:, 2], values[:, 3])
+    ((a1, b1, c1, d1), (a2, b2, c2, d2), (a3, b3, c3, d3)) = (matrix[0], matrix[1], matrix[2])
+    # infinite values give nan or inf silently, like python floats
+    with numpy.errstate(over="ignore", invalid="ignore"):
+        new_z = a3 * x + b3 * y + c3 * z + d3 * h
+        clip_x = a1 * x + b1 * y + c1 * z + d1 * h
+        clip_y = a2 * x + b2 * y + c2 * z + d2 * h
+        behind = new_z == 0.0
+        if not depth:
+            if behind.any():
+                raise ZeroDivisionError("float division by zero")
+            screen_x = center_x + view_x * clip_x / new_z + view_x
+            screen_y = center_y + view_y * clip_y / new_z + view_y
+            return list(zip(screen_x.tolist(), screen_y.tolist()))
+        with numpy.errstate(divide="ignore"):
+            inverse_depth = 1.0 / new_z
+        screen_x = center_x + view_x * clip_x * inverse_depth + view_x
+        screen_y = center_y + view_y * clip_y * inverse_depth + view_y
+    ret_data = list(zip(screen_x.tolist(), screen_y.tolist(), inverse_depth.tolist()))
+    for index in numpy.flatnonzero(behind).tolist():
+        ret_data[index] = (center_x, center_y, 0.0)
+    return ret_data
+
+
+set_backend(os.environ.get(ENV_BACKEND, BACKEND))
@@ -0,0 +1,145 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import math
+# own modules
+import Backend3D
+from Vector3D import Vector3D as Vector3D
+from VertexArray import VertexArray as VertexArray
+
+class BoundingBox3D(object):
+    """
+    axis aligned bounding box
+
+    minimum and maximum are tuples (x, y, z)
+    """
+
+    def __init__(self, minimum, maximum):
+        self.minimum = tuple(minimum)
+        self.maximum = tuple(maximum)
+
+    @classmethod
+    def from_vertices(cls, vertices):
+        """create smallest box around all vertices of VertexArray"""
+        if Backend3D.is_numpy(vertices):
+            return cls(*Backend3D.get_bounds(vertices.values))
+        data = vertices.data
+        assert len(data) > 0
+        min_x = max_x = data[0]
+        min_y = max_y = data[1]
+        min_z = max_z = data[2]
+        for index in range(4, len(data), 4):
+            x = data[index]
+            y = data[index + 1]
+            z = data[index + 2]
+            if x < min_x:
+                min_x = x
+            elif x > max_x:
+                max_x = x
+            if y < min_y:
+                min_y = y
+            elif y > max_y:
+                max_y = y
+            if z < min_z:
+                min_z = z
+            elif z > max_z:
+                max_z = z
+        return cls((min_x, min_y, min_z), (max_x, max_y, max_z))
+
+    def __eq__(self, other):
+        return self.minimum == other.minimum and self.maximum == other.maximum
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "BoundingBox3D(%s, %s)" % (self.minimum, self.maximum)
+
+    def get_center(self):
+        """return center of box as Vector3D"""
+        return Vector3D(
+            (self.minimum[0] + self.maximum[0]) / 2.0,
+            (self.minimum[1] + self.maximum[1]) / 2.0,
+            (self.minimum[2] + self.maximum[2]) / 2.0,
+            1.0)
+
+    def get_corners(self):
+        """return the eight corners of box as VertexArray"""
+        (min_x, min_y, min_z) = self.minimum
+        (max_x, max_y, max_z) = self.maximum
+        return VertexArray.from_vectors((
+            (min_x, min_y, min_z, 1.0),
+            (max_x, min_y, min_z, 1.0),
+            (max_x, max_y, min_z, 1.0),
+            (min_x, max_y, min_z, 1.0),
+            (min_x, min_y, max_z, 1.0),
+            (max_x, min_y, max_z, 1.0),
+            (max_x, max_y, max_z, 1.0),
+            (min_x, max_y, max_z, 1.0),
+        ))
+
+    def transform(self, matrix):
+        """
+        return box around transformed box
+        only the eight corners are transformed, so the result
+        contains every transformed vertex, but may be larger than
+        the box around these vertices
+        """
+        return BoundingBox3D.from_vertices(self.get_corners().transform(matrix))
+
+    def contains(self, vector):
+        """True if point vector is inside box"""
+        return all((self.minimum[index] <= vector[index] <= self.maximum[index] for index in range(3)))
+
+    def intersects(self, other):
+        """True if box other overlaps with self"""
+        return all((self.minimum[index] <= other.maximum[index] and other.minimum[index] <= self.maximum[index] for index in range(3)))
+
+
+class BoundingSphere3D(object):
+    """
+    bounding sphere, given by center Vector3D and radius
+    """
+
+    def __init__(self, center, radius):
+        self.center = center
+        self.radius = radius
+
+    @classmethod
+    def from_vertices(cls, vertices):
+        """
+        create sphere around all vertices of VertexArray
+        center is the center of the bounding box, so the sphere is
+        not always the smallest possible one
+        """
+        center = BoundingBox3D.from_vertices(vertices).get_center()
+        (center_x, center_y, center_z) = (center.x, center.y, center.z)
+        if Backend3D.is_numpy(vertices):
+            return cls(center, math.sqrt(Backend3D.get_radius_sqrd(vertices.values, (center_x, center_y, center_z))))
+        data = vertices.data
+        radius_sqrd = 0.0
+        for index in range(0, len(data), 4):
+            distance_sqrd = (data[index] - center_x) ** 2 + (data[index + 1] - center_y) ** 2 + (data[index + 2] - center_z) ** 2
+            if distance_sqrd > radius_sqrd:
+                radius_sqrd = distance_sqrd
+        return cls(center, math.sqrt(radius_sqrd))
+
+    def __repr__(self):
+        return "BoundingSphere3D(%r, %f)" % (self.center, self.radius)
+
+    def transform(self, matrix):
+        """
+        return sphere around transformed sphere
+        center is transformed, radius is scaled by the longest
+        transformed axis, matrix should be affine
+        """
+        scale = max((math.sqrt(matrix[0][col] ** 2 + matrix[1][col] ** 2 + matrix[2][col] ** 2) for col in range(3)))
+        return BoundingSphere3D(matrix.v_dot(self.center), self.radius * scale)
+
+    def contains(self, vector):
+        """True if point vector is inside sphere"""
+        return (vector[0] - self.center[0]) ** 2 + (vector[1] - self.center[1]) ** 2 + (vector[2] - self.center[2]) ** 2 <= self.radius ** 2
+
+    def intersects(self, other):
+        """True if sphere other overlaps with self"""
+        return (other.center[0] - self.center[0]) ** 2 + (other.center[1] - self.center[1]) ** 2 + (other.center[2] - self.center[2]) ** 2 <= (self.radius + other.radius) ** 2
@@ -0,0 +1,269 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from array import array
+# own modules
+import Profiler3D
+import Backend3D
+from Matrix3D import Matrix3D as Matrix3D
+from Vector3D import Vector3D as Vector3D
+from VertexArray import VertexArray as VertexArray
+
+# outcode bits of vertices outside of view frustum, in clipping space
+OUT_LEFT = 1
+OUT_RIGHT = 2
+OUT_BOTTOM = 4
+OUT_TOP = 8
+OUT_NEAR = 16
+OUT_FAR = 32
+OUT_BITS = (OUT_LEFT, OUT_RIGHT, OUT_BOTTOM, OUT_TOP, OUT_NEAR, OUT_FAR)
+
+def _parameter(name, doc):
+    """
+    camera parameter as property,
+    changing the value invalidates the cached matrices
+    """
+    attr = "_" + name
+    def getter(self):
+        return getattr(self, attr)
+    def setter(self, value):
+        if getattr(self, attr) != value:
+            setattr(self, attr, value)
+            self._matrix = None
+            self._eye = None
+    return property(getter, setter, doc=doc)
+
+
+class Camera3D(object):
+    """
+    camera with perspective projection to 2D screen coordinates
+
+    view and projection matrix are combined to one Matrix3D,
+    which is cached until some camera parameter changes, so
+    projection of a vertex is a single matrix-vector multiply
+    plus divide
+    """
+
+    fov = _parameter("fov", "field of view factor, 1 / tan(angle / 2)")
+    aspect_ratio = _parameter("aspect_ratio", "aspect ratio of screen, width / height")
+    near = _parameter("near", "distance of near clipping plane")
+    far = _parameter("far", "distance of far clipping plane")
+    position = _parameter("position", "tuple (x, y, z) camera translation")
+    x_angle = _parameter("x_angle", "camera rotation around X-Axis in radians")
+    y_angle = _parameter("y_angle", "camera rotation around Y-Axis in radians")
+
+    def __init__(self, center, fov=1.0, aspect_ratio=16.0/9.0, near=1.0, far=100.0, position=(0.0, 0.0, -10.0), x_angle=0.0, y_angle=0.0, viewport=(8.0, 4.5)):
+        """
+        center - tuple (x, y) of screen center
+        viewport - tuple (x, y) scaling of projected coordinates
+        all others, see properties
+        """
+        self.center = center
+        self.viewport = viewport
+        self._fov = fov
+        self._aspect_ratio = aspect_ratio
+        self._near = near
+        self._far = far
+        self._position = position
+        self._x_angle = x_angle
+        self._y_angle = y_angle
+        self._matrix = None
+        self._eye = None
+
+    def get_projection_matrix(self):
+        """
+        return clipping matrix
+        taken from : http://stackoverflow.com/questions/724219/how-to-convert-a-3d-point-into-2d-perspective-projection
+        """
+        fov = self._fov
+        near = self._near
+        far = self._far
+        return Matrix3D([
+            [fov * self._aspect_ratio, 0.0, 0.0                      , 0.0],
+            [0.0                     , fov, 0.0                      , 0.0],
+            [0.0                     , 0.0, (far + near) / (far-near), (2.0 * near * far) / (near-far)],
+            [0.0                     , 0.0, 1.0                      , 0.0]
+        ])
+
+    def get_view_matrix(self):
+        """
+        return camera transformation matrix
+        camera translation and camera rotation
+        """
+        return Matrix3D.compose(
+            Matrix3D.get_shift_matrix(*self._position),
+            Matrix3D.get_rot_y_matrix(self._y_angle),
+            Matrix3D.get_rot_x_matrix(self._x_angle))
+
+    def get_matrix(self):
+        """
+        return combined view and projection matrix,
+        calculated only once until some parameter changes
+        """
+        if self._matrix is None:
+            # mind the order !!
+            self._matrix = self.get_projection_matrix().dot(self.get_view_matrix())
+        return self._matrix
+
+    def get_eye(self):
+        """
+        return position of camera in world coordinates as Vector3D,
+        calculated only once until some parameter changes
+        """
+        if self._eye is None:
+            self._eye = self.get_view_matrix().inverse().v_dot(Vector3D(0.0, 0.0, 0.0, 1.0))
+        return self._eye
+
+    def get_ray(self, screen_x, screen_y):
+        """
+        return tuple (origin, direction) of Vector3D objects in world
+        coordinates, the ray of all points projected to screen_x, screen_y
+        useful for picking, see BVH3D.pick
+
+        origin is the center of projection, where projected z is zero
+        direction points in direction of positive projected z
+        """
+        (center_x, center_y) = self.center
+        (view_x, view_y) = self.viewport
+        matrix = self.get_matrix()
+        inverse = matrix.inverse()
+        origin = inverse.v_dot(Vector3D(0.0, 0.0, 0.0, 1.0))
+        # some point with projected x / projected z = screen_x, and so on
+        point = inverse.v_dot(Vector3D(
+            (screen_x - center_x - view_x) / view_x,
+            (screen_y - center_y - view_y) / view_y,
+            1.0, 0.0))
+        origin = Vector3D(origin.x / origin.h, origin.y / origin.h, origin.z / origin.h, 1.0)
+        direction = Vector3D(
+            point.x / point.h - origin.x,
+            point.y / point.h - origin.y,
+            point.z / point.h - origin.z,
+            0.0)
+        (a3, b3, c3, _) = matrix[2]
+        if a3 * direction.x + b3 * direction.y + c3 * direction.z < 0:
+            direction = Vector3D(-direction.x, -direction.y, -direction.z, 0.0)
+        return origin, direction
+
+    def get_outcodes(self, vertices):
+        """
+        return array of outcodes, one for every vertex in VertexArray
+
+        every vertex is transformed to clipping space (x, y, z, w),
+        vertices inside the view frustum satisfy -w <= x, y, z <= w
+        and get outcode 0, otherwise some of the OUT_* bits are set
+        """
+        if Backend3D.is_numpy(vertices):
+            return array("i", Backend3D.get_outcodes(vertices.values, self.get_matrix(), OUT_BITS).tolist())
+        ((a1, b1, c1, d1),
+         (a2, b2, c2, d2),
+         (a3, b3, c3, d3),
+         (a4, b4, c4, d4)) = self.get_matrix()
+        data = vertices.data
+        outcodes = array("i", [0]) * len(vertices)
+        for index in range(0, len(data), 4):
+            x = data[index]
+            y = data[index + 1]
+            z = data[index + 2]
+            h = data[index + 3]
+            clip_x = a1 * x + b1 * y + c1 * z + d1 * h
+            clip_y = a2 * x + b2 * y + c2 * z + d2 * h
+            clip_z = a3 * x + b3 * y + c3 * z + d3 * h
+            clip_w = a4 * x + b4 * y + c4 * z + d4 * h
+            code = 0
+            if clip_x < -clip_w:
+                code |= OUT_LEFT
+            elif clip_x > clip_w:
+                code |= OUT_RIGHT
+            if clip_y < -clip_w:
+                code |= OUT_BOTTOM
+            elif clip_y > clip_w:
+                code |= OUT_TOP
+            if clip_z < -clip_w:
+                code |= OUT_NEAR
+            elif clip_z > clip_w:
+                code |= OUT_FAR
+            outcodes[index // 4] = code
+        return outcodes
+
+    def project(self, vector):
+        """project one Vector3D and return tuple of 2D Coordinates"""
+        return self.project_many((vector, ))[0]
+
+    def project_many(self, vertices):
+        """
+        project vertices to 2D screen coordinates
+
+        vertices is a VertexArray or a iterable of Vector3D objects
+        returns list of tuples (x, y)
+        """
+        matrix = self.get_matrix()
+        ((a1, b1, c1, d1),
+         (a2, b2, c2, d2),
+         (a3, b3, c3, d3)) = (matrix[0], matrix[1], matrix[2])
+        (center_x, center_y) = self.center
+        (view_x, view_y) = self.viewport
+        with Profiler3D.stage("project"):
+            ret_data = []
+            append = ret_data.append
+            if Backend3D.is_numpy(vertices):
+                ret_data = Backend3D.project(vertices.values, matrix, self.center, self.viewport)
+            elif isinstance(vertices, VertexArray):
+                data = vertices.data
+                for index in range(0, len(data), 4):
+                    x = data[index]
+                    y = data[index + 1]
+                    z = data[index + 2]
+                    h = data[index + 3]
+                    new_z = a3 * x + b3 * y + c3 * z + d3 * h
+                    append((
+                        center_x + view_x * (a1 * x + b1 * y + c1 * z + d1 * h) / new_z + view_x,
+                        center_y + view_y * (a2 * x + b2 * y + c2 * z + d2 * h) / new_z + view_y))
+            else:
+                for x, y, z, h in vertices:
+                    new_z = a3 * x + b3 * y + c3 * z + d3 * h
+                    append((
+                        center_x + view_x * (a1 * x + b1 * y + c1 * z + d1 * h) / new_z + view_x,
+                        center_y + view_y * (a2 * x + b2 * y + c2 * z + d2 * h) / new_z + view_y))
+        Profiler3D.count("vertices_projected", len(ret_data))
+        return ret_data
+
+    def project_many_depth(self, vertices):
+        """
+        project vertices to 2D screen coordinates plus depth
+
+        vertices is a VertexArray
+        returns list of tuples (x, y, inverse_depth), screen coordinates
+        like project_many, inverse_depth is 1 / projected z, bigger values
+        are nearer to the camera, in contrast to z itself this is linear in
+        screen coordinates, so it could be interpolated over a triangle
+        vertices behind the camera get inverse_depth <= 0
+        """
+        matrix = self.get_matrix()
+        ((a1, b1, c1, d1),
+         (a2, b2, c2, d2),
+         (a3, b3, c3, d3)) = (matrix[0], matrix[1], matrix[2])
+        (center_x, center_y) = self.center
+        (view_x, view_y) = self.viewport
+        with Profiler3D.stage("project"):
+            ret_data = []
+            append = ret_data.append
+            if Backend3D.is_numpy(vertices):
+                ret_data = Backend3D.project(vertices.values, matrix, self.center, self.viewport, depth=True)
+            else:
+                data = vertices.data
+                for index in range(0, len(data), 4):
+                    x = data[index]
+                    y = data[index + 1]
+                    z = data[index + 2]
+                    h = data[index + 3]
+                    new_z = a3 * x + b3 * y + c3 * z + d3 * h
+                    if new_z == 0.0:
+                        append((center_x, center_y, 0.0))
+                        continue
+                    inverse_depth = 1.0 / new_z
+                    append((
+                        center_x + view_x * (a1 * x + b1 * y + c1 * z + d1 * h) * inverse_depth + view_x,
+                        center_y + view_y * (a2 * x + b2 * y + c2 * z + d2 * h) * inverse_depth + view_y,
+                        inverse_depth))
+        Profiler3D.count("vertices_projected", len(ret_data))
+        return ret_data
@@ -0,0 +1,50 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# own modules
+import Profiler3D
+
+class DepthSort3D(object):
+    """
+    painters algorithm, frame coherent depth sorting of Mesh3D faces
+
+    the order of faces changes only a little from frame to frame,
+    so the order of the last frame is kept and sorted again with
+    the new depth keys, list.sort (timsort) detects the already
+    sorted runs and needs nearly linear time for nearly sorted input
+    """
+
+    def __init__(self):
+        self.order = None
+
+    def reset(self):
+        """forget order of last frame, next sort starts from scratch"""
+        self.order = None
+
+    def sort(self, keys, face_indices=None):
+        """
+        return list of face indices sorted back to front,
+        biggest key first
+
+        keys is list of depth keys, one for every face
+        face_indices is a optional subset of faces to return,
+        like the visible faces after culling, all faces are
+        sorted anyway to keep the order for the next frame
+        """
+        order = self.order
+        if order is None or len(order) != len(keys):
+            order = list(range(len(keys)))
+        with Profiler3D.stage("sort"):
+            order.sort(key=keys.__getitem__, reverse=True)
+        self.order = order
+        if face_indices is None:
+            return list(order)
+        selected = set(face_indices)
+        return [index for index in order if index in selected]
+
+    def sort_mesh(self, mesh, matrix=None, face_indices=None):
+        """
+        return face indices of Mesh3D sorted back to front
+        matrix is passed to Mesh3D.get_depth_keys
+        """
+        return self.sort(mesh.get_depth_keys(matrix), face_indices)
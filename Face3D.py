@@ -2,8 +2,12 @@
 # -*- coding: utf-8 -*-
 
 import math
+import Profiler3D
 from Matrix3D import Matrix3D as Matrix3D
 from Vector3D import Vector3D as Vector3D
+from VertexArray import VertexArray as VertexArray
+from Bounds3D import BoundingBox3D as BoundingBox3D
+from Bounds3D import BoundingSphere3D as BoundingSphere3D
 
 class Face3D(object):
     """
@@ -13,32 +17,195 @@ class Face3D(object):
     with dimension 3 or 4 (homogeneous)
     """
 
-    def __init__(self, vertices):
+    def __init__(self, vertices, matrix=None, normal_matrix=None):
         """
-        vertices is a list of Vector3D objects
+        vertices is a list of Vector3D objects, or a VertexArray
+        vertices are stored as VertexArray in any case
+
+        matrix is a optional pending transformation,
+        it is applied to vertices on first access of vertices,
+        the normal is calculated on first access, see normal
+        normal_matrix is matrix.get_normal_matrix(), if already known
         """
-        # vertices should be list of Vector3D objects
-        assert all((isinstance(vertice, Vector3D) for vertice in vertices))
-        self.vertices = vertices
+        if not isinstance(vertices, VertexArray):
+            # vertices should be list of Vector3D objects
+            assert all((isinstance(vertice, Vector3D) for vertice in vertices))
+            vertices = VertexArray.from_vectors(vertices)
         self.len_vertices = len(vertices)
-        self.normal = self._get_normal_faster()
+        self.__base = vertices
+        self.__matrix = matrix
+        self.__normal_matrix = normal_matrix
+        self.__vertices = vertices if matrix is None else None
+        self.__normal = None
+        # normal of base vertices, if known before transformation
+        self.__base_normal = None
+        # vertices are shared with faces returned by transform
+        self.__shared = False
+        # number of calls of set_vertex
+        self.__version = 0
+        # bounds are derived from bounds of base face, if there is one,
+        # and if base face is still the same version
+        self.__base_face = None
+        self.__base_matrix = None
+        self.__base_version = 0
+        self.__box = None
+        self.__sphere = None
+
+    def __resolve(self):
+        """apply pending transformation once"""
+        self.__vertices = self.__base.transform(self.__matrix)
+        self.__base = None
+        self.__matrix = None
+        self.__normal_matrix = None
+        self.__base_normal = None
+        if Profiler3D.ENABLED:
+            Profiler3D.count("vertices_transformed", self.len_vertices)
+
+    @property
+    def vertices(self):
+        """VertexArray of vertices, with pending transformation applied"""
+        if self.__matrix is not None:
+            self.__resolve()
+        return self.__vertices
+
+    @property
+    def normal(self):
+        """
+        normal vector of face, see _get_normal_faster
+        calculated on first access only
+
+        if the transformation is still pending, the normal of the
+        base vertices is transformed by the cofactor matrix, see
+        Matrix3D.get_normal_matrix, without transforming any vertex,
+        the cofactor matrix is calculated once per call of transform
+        """
+        if self.__normal is None:
+            if self.__matrix is None:
+                self.__normal = self._get_normal_faster()
+            else:
+                self.__normal = self.__get_transformed_normal()
+        return self.__normal
+
+    def __get_transformed_normal(self):
+        """return normal of vertices with pending transformation applied"""
+        data = self.__base.data
+        if not data[3] == data[7] == data[11]:
+            # different homogeneous parts, translation is not cancelled out in edges
+            self.__resolve()
+            return self._get_normal_faster()
+        (x, y, z) = (self.__base_normal or self._get_normal_faster(data))[:3]
+        if self.__normal_matrix is None:
+            self.__normal_matrix = self.__matrix.get_normal_matrix()
+        ((a1, b1, c1), (a2, b2, c2), (a3, b3, c3)) = self.__normal_matrix
+        return (a1 * x + b1 * y + c1 * z, a2 * x + b2 * y + c2 * z, a3 * x + b3 * y + c3 * z, 1.0)
+
+    def get_pending_matrix(self):
+        """
+        return transformation not yet applied to vertices,
+        or None if vertices are up to date
+        """
+        return self.__matrix
+
+    def set_vertex(self, index, vector):
+        """
+        overwrite vertex at index
+        cached normal and bounds are invalidated
+
+        if vertices are shared with faces returned by transform,
+        they are copied before, see Mesh3D.set_vertex
+        """
+        vertices = self.vertices
+        if self.__shared:
+            vertices = self.__vertices = vertices.copy()
+            self.__shared = False
+        vertices[index] = vector
+        self.__version += 1
+        self.__normal = None
+        self.__base_face = None
+        self.__base_matrix = None
+        self.__box = None
+        self.__sphere = None
+
+    def get_bounding_box(self):
+        """
+        return axis aligned BoundingBox3D around vertices
+
+        calculated once and cached, for transformed faces the box
+        of the original face is transformed, without touching vertices
+        """
+        if self.__box is None:
+            if self.__get_base_face() is not None:
+                self.__box = self.__base_face.get_bounding_box().transform(self.__base_matrix)
+            else:
+                self.__box = BoundingBox3D.from_vertices(self.vertices)
+        return self.__box
+
+    def get_bounding_sphere(self):
+        """
+        return BoundingSphere3D around vertices
+        cached like get_bounding_box
+        """
+        if self.__sphere is None:
+            if self.__get_base_face() is not None:
+                self.__sphere = self.__base_face.get_bounding_sphere().transform(self.__base_matrix)
+            else:
+                self.__sphere = BoundingSphere3D.from_vertices(self.vertices)
+        return self.__sphere
+
+    def __get_base_face(self):
+        """return base face of bounds, None if it changed since transform"""
+        if self.__base_face is not None and self.__base_face.__version != self.__base_version:
+            self.__base_face = None
+            self.__base_matrix = None
+        return self.__base_face
 
     def __getitem__(self, key):
         return self.vertices[key]
 
     def get_avg_z(self):
-        """return average z of vertices"""
-        return sum((vector.z for vector in vertices)) / len(self.vertices)
+        """
+        return average z of vertices
+        useful as depth key, to sort faces back to front
+        """
+        return sum(self.vertices.data[2::4]) / self.len_vertices
 
-    def transform(self, matrix):
+    def transform(self, matrix, normal_matrix=None):
         """
         apply transformation to all vertices
         technically for every vertice in vertices do
 
         new_vertice = vertice DOT matrix
+
+        the transformation is lazy, the returned Face3D only remembers
+        the matrix, chained transformations are combined to one matrix
+        and applied to the vertices only once, when they are read
+        a already calculated normal is passed on, see normal, it stays
+        valid, because set_vertex copies vertices shared with the result
+
+        the cofactor matrix of the combined matrix, to transform
+        the normal, is calculated here once and passed on with it,
+        normal_matrix is matrix.get_normal_matrix(), to calculate it
+        only once for many faces transformed by the same matrix
         """
-        new_vertices = tuple((matrix.v_dot(vertice) for vertice in self.vertices))
-        return Face3D(new_vertices)
+        if self.__matrix is None:
+            if normal_matrix is None:
+                normal_matrix = matrix.get_normal_matrix()
+            face = Face3D(self.__vertices, matrix, normal_matrix)
+            face.__base_normal = self.__normal
+            self.__shared = True
+        else:
+            combined = matrix.dot(self.__matrix)
+            face = Face3D(self.__base, combined, combined.get_normal_matrix())
+            face.__base_normal = self.__base_normal
+        if self.__get_base_face() is None:
+            face.__base_face = self
+            face.__base_matrix = matrix
+            face.__base_version = self.__version
+        else:
+            face.__base_face = self.__base_face
+            face.__base_matrix = matrix.dot(self.__base_matrix)
+            face.__base_version = self.__base_version
+        return face
 
     def get_normal(self):
         """
@@ -52,12 +219,12 @@ class Face3D(object):
         normal = cross(v1 and v2)
         """
         # get at least two vectors on plane to calculate normal
-        v1 = self.vertices[0][:3] - self.vertices[1][:3]
-        v2 = self.vertices[0][:3] - self.vertices[2][:3]
-        normal = np.cross(v1, v2)
-        return np.append(normal, 1.0)
+        v1 = self.vertices[0] - self.vertices[1]
+        v2 = self.vertices[0] - self.vertices[2]
+        normal = v1.cross(v2)
+        return (normal.x, normal.y, normal.z, 1.0)
 
-    def _get_normal_faster(self):
+    def _get_normal_faster(self, data=None):
         """
         calculate normal vector to polygon
         the returned result is not normalized
@@ -67,13 +234,24 @@ class Face3D(object):
         get v1 = (B-A)
         get v2 = (C-A)
         normal = cross(v1 and v2)
+
+        data is a flat vertex buffer, defaults to buffer of vertices
         """
         # get at least two vectors on plane to calculate normal
-        v1 = self.vertices[0] - self.vertices[1]
-        v2 = self.vertices[0] - self.vertices[2]
-        x = v1[1] * v2[2] - v1[2] * v2[1]
-        y = v1[2] * v2[0] - v1[0] * v2[2]
-        z = v1[0] * v2[1] - v1[1] * v2[0]
+        # read directly from VertexArray buffer, without Vector3D objects
+        if data is None:
+            data = self.vertices.data
+        v1_x = data[0] - data[4]
+        v1_y = data[1] - data[5]
+        v1_z = data[2] - data[6]
+        v2_x = data[0] - data[8]
+        v2_y = data[1] - data[9]
+        v2_z = data[2] - data[10]
+        x = v1_y * v2_z - v1_z * v2_y
+        y = v1_z * v2_x - v1_x * v2_z
+        z = v1_x * v2_y - v1_y * v2_x
+        if Profiler3D.ENABLED:
+            Profiler3D.count("face_normals")
         return (x, y, z, 1.0)
 
     def get_normal_faster(self):
@@ -90,21 +268,39 @@ class Face3D(object):
 
         sum all edge normal vector, finally normalize result
         """
-        # calculate vector notmal wiothout homogeneous part,
-        # cross product is only well defined for 2 and 3 dimensional verctors
-        normal = np.zeros(4)
-        for index in range(self.len_vertices - 1):
-            normal += np.linalg.cross(self.vertices[index], self.vertices[index+1])
+        (x, y, z) = self.get_area_normal()
+        length = math.sqrt(x * x + y * y + z * z)
+        if length == 0.0:
+            return (0.0, 0.0, 0.0, 1.0)
         # finally add homgeneous part
-        return np.append(normal, 1.0)
+        return (x / length, y / length, z / length, 1.0)
+
+    def get_area_normal(self):
+        """
+        return tuple (x, y, z), sum of cross products of all
+        consecutive vertices, including last and first one
+
+        for planar polygons this is the normal with a length of
+        twice the area, same orientation as _get_normal_faster
+        translation cancels out, so only x, y, z are used
+        """
+        data = self.vertices.data
+        (x, y, z) = (0.0, 0.0, 0.0)
+        (x1, y1, z1) = (data[-4], data[-3], data[-2])
+        for index in range(0, len(data), 4):
+            (x2, y2, z2) = (data[index], data[index + 1], data[index + 2])
+            x += y1 * z2 - z1 * y2
+            y += z1 * x2 - x1 * z2
+            z += x1 * y2 - y1 * x2
+            (x1, y1, z1) = (x2, y2, z2)
+        return (x, y, z)
 
     def get_area(self):
         """
         are is defined as the half of the lenght of the polygon normal
         """
-        normal = self.get_normal()
-        area = np.linalg.norm(normal) / 2.0
-        return area
+        (x, y, z) = self.get_area_normal()
+        return math.sqrt(x * x + y * y + z * z) / 2.0
 
     def get_position_vector(self):
         """
@@ -117,19 +313,5 @@ class Face3D(object):
             pos_vec += vector
         return pos_vec / self.len_vertices
 
-    def __richcmp__(obj1, obj2, method):
-        if method == 0: # < __lt__
-            return obj1.get_avg_z() < obj2.self.avg_z()
-        elif method == 2: # == __eq__
-            return obj1.vertices == obj2.vertices
-        elif method == 4: # > __gt__
-            return obj1.get_avg_z() > obj2.self.avg_z()
-        elif method == 1: # <= lower_equal
-            return obj1.get_avg_z() <= obj2.self.avg_z()
-        elif method == 3: # != __ne__
-            return obj1.vertices != obj2.vertices
-        elif method == 5: # >= greater equal
-            return obj1.get_avg_z() >= obj2.self.avg_z()
- 
     def __str__(self):
         return str(self.vertices)
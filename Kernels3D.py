@@ -0,0 +1,155 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+straight line kernels for Matrix3D, generated at import
+
+every kernel is emitted as python source with all loops over rows and
+columns unrolled, and all matrix coefficients as local variables
+m00 .. m33 (row, column), then compiled once with exec
+
+for special kinds of matrices some coefficients are known to be 0 or 1,
+these are left out of the generated expressions, so a translation
+needs 3 multiplications per vertex instead of 16
+
+kinds, from most to least special
+translation : upper 3 x 3 is identity, last row 0, 0, 0, 1
+scale       : only diagonal, last row 0, 0, 0, 1
+linear      : no translation, last row 0, 0, 0, 1, like rotations
+affine      : last row 0, 0, 0, 1
+projective  : anything else
+
+kernels, working on Matrix3D data, a list of 4 rows of 4 values
+dot(data1, data2)                  : product, list of rows
+dot_affine(data1, data2)           : product of two affine matrices
+v_dot(data, x, y, z, h)            : tuple (x, y, z, h) of transformed vector
+transpose(data)                    : transposed list of rows
+scale(data, scalar)                : every value multiplied by scalar
+TRANSFORM_INTO[kind](data, src, dst, start, stop)
+                                   : like Matrix3D.transform_into
+"""
+
+# known coefficients of every kind, dictionary (row, col) -> value
+_LAST_ROW = {(3, 0): 0.0, (3, 1): 0.0, (3, 2): 0.0, (3, 3): 1.0}
+_NO_SHIFT = {(0, 3): 0.0, (1, 3): 0.0, (2, 3): 0.0}
+_IDENTITY = dict((((row, col), 1.0 if row == col else 0.0) for row in range(3) for col in range(3)))
+_DIAGONAL = dict((((row, col), 0.0) for row in range(3) for col in range(3) if row != col))
+
+def _known(*parts):
+    known = {}
+    for part in parts:
+        known.update(part)
+    return known
+
+KNOWN = {
+    "translation": _known(_LAST_ROW, _IDENTITY),
+    "scale": _known(_LAST_ROW, _NO_SHIFT, _DIAGONAL),
+    "linear": _known(_LAST_ROW, _NO_SHIFT),
+    "affine": _known(_LAST_ROW),
+    "projective": {},
+}
+KINDS = ("translation", "scale", "linear", "affine", "projective")
+
+# generated source of every kernel, by name
+SOURCES = {}
+
+def get_kind(data):
+    """return most special kind of matrix data, see KINDS"""
+    for kind in KINDS:
+        known = KNOWN[kind]
+        if all((data[row][col] == value for ((row, col), value) in known.items())):
+            return kind
+    return "projective"
+
+def _compile(name, source):
+    """compile generated source of function name, return function"""
+    namespace = {}
+    exec(compile(source, "<Kernels3D %s>" % name, "exec"), namespace)
+    SOURCES[name] = source
+    return namespace[name]
+
+def _coefficient(prefix, row, col, known):
+    """return known value of coefficient, or its local variable name"""
+    return known.get((row, col), "%s%d%d" % (prefix, row, col))
+
+def _sum(products):
+    """
+    return python expression of sum of products,
+    every product is a tuple of factors, numbers or variable names,
+    products with a zero factor are left out, factors of one too
+    """
+    terms = []
+    constant = 0.0
+    for factors in products:
+        names = [factor for factor in factors if isinstance(factor, str)]
+        value = 1.0
+        for factor in factors:
+            if not isinstance(factor, str):
+                value *= factor
+        if value == 0.0:
+            continue
+        if not names:
+            constant += value
+        elif value == 1.0:
+            terms.append(" * ".join(names))
+        else:
+            terms.append(" * ".join([repr(value)] + names))
+    if constant != 0.0 or not terms:
+        terms.append(repr(constant))
+    return " + ".join(terms)
+
+def _unpack(prefix, target):
+    """source line unpacking 4 x 4 matrix target into local variables"""
+    rows = ", ".join(("(%s)" % ", ".join(("%s%d%d" % (prefix, row, col) for col in range(4))) for row in range(4)))
+    return "    (%s) = %s\n" % (rows, target)
+
+def _gen_dot(name, kind):
+    """product of two matrices of kind"""
+    known = KNOWN[kind]
+    source = "def %s(data1, data2):\n" % name
+    source += _unpack("a", "data1") + _unpack("b", "data2")
+    rows = []
+    for row in range(4):
+        rows.append("[%s]" % ", ".join((_sum([(
+            _coefficient("a", row, k, known),
+            _coefficient("b", k, col, known)) for k in range(4)]) for col in range(4))))
+    source += "    return [%s]\n" % ", ".join(rows)
+    return _compile(name, source)
+
+def _gen_v_dot():
+    source = "def v_dot(data, x, y, z, h):\n" + _unpack("m", "data")
+    source += "    return (%s)\n" % ", ".join((_sum([("m%d%d" % (row, col), "xyzh"[col]) for col in range(4)]) for row in range(4)))
+    return _compile("v_dot", source)
+
+def _gen_transpose():
+    source = "def transpose(data):\n" + _unpack("m", "data")
+    source += "    return [%s]\n" % ", ".join(("[%s]" % ", ".join(("m%d%d" % (row, col) for row in range(4))) for col in range(4)))
+    return _compile("transpose", source)
+
+def _gen_scale():
+    source = "def scale(data, scalar):\n" + _unpack("m", "data")
+    source += "    return [%s]\n" % ", ".join(("[%s]" % ", ".join(("m%d%d * scalar" % (row, col) for col in range(4))) for row in range(4)))
+    return _compile("scale", source)
+
+def _gen_transform_into(kind):
+    """transform vertices start to stop of flat buffer src into dst"""
+    known = KNOWN[kind]
+    name = "transform_into_%s" % kind
+    source = "def %s(data, src, dst, start, stop):\n" % name
+    source += _unpack("m", "data")
+    source += "    for index in range(4 * start, 4 * stop, 4):\n"
+    source += "        x = src[index]\n"
+    source += "        y = src[index + 1]\n"
+    source += "        z = src[index + 2]\n"
+    source += "        h = src[index + 3]\n"
+    for row in range(4):
+        expression = _sum([(_coefficient("m", row, col, known), "xyzh"[col]) for col in range(4)])
+        source += "        dst[index%s] = %s\n" % (" + %d" % row if row else "", expression)
+    source += "    return dst\n"
+    return _compile(name, source)
+
+dot = _gen_dot("dot", "projective")
+dot_affine = _gen_dot("dot_affine", "affine")
+v_dot = _gen_v_dot()
+transpose = _gen_transpose()
+scale = _gen_scale()
+TRANSFORM_INTO = dict(((kind, _gen_transform_into(kind)) for kind in KINDS))
@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+from array import array
+# own modules
+from Mesh3D import Mesh3D as Mesh3D
+from VertexArray import VertexArray as VertexArray
+
+# number of binary STL triangles read at once
+STL_CHUNK = 4096
+STL_HEADER = 80
+STL_RECORD = struct.Struct("<12fH")
+
+class _Welder(object):
+    """
+    collects vertices and face indices while loading,
+    vertices at exactly the same position are stored only once
+    """
+
+    def __init__(self):
+        self.data = array("d")
+        self.indices = array("i")
+        self.offsets = array("i", [0])
+        self.lookup = {}
+
+    def add_vertex(self, key, x, y, z):
+        """
+        return pool index of vertex, key identifies the position,
+        new vertices are appended to the pool
+        """
+        index = self.lookup.get(key)
+        if index is None:
+            index = len(self.data) // 4
+            self.lookup[key] = index
+            self.data.extend((x, y, z, 1.0))
+        return index
+
+    def add_face(self, face_indices):
+        self.indices.extend(face_indices)
+        self.offsets.append(len(self.indices))
+
+    def get_mesh(self):
+        return Mesh3D.from_indexed(VertexArray(self.data), self.indices, self.offsets)
+
+
+def load_obj(filename):
+    """
+    load Wavefront OBJ file and return indexed Mesh3D
+
+    the file is read line by line, only vertices (v) and faces (f)
+    are used, vertices with equal position are welded together
+    """
+    welder = _Welder()
+    # OBJ vertex number to pool index
+    pool_indices = array("i")
+    with open(filename, "r") as infile:
+        for line in infile:
+            if line.startswith("v "):
+                values = line.split()
+                (x, y, z) = (float(values[1]), float(values[2]), float(values[3]))
+                pool_indices.append(welder.add_vertex((x, y, z), x, y, z))
+            elif line.startswith("f "):
+                face_indices = []
+                for value in line.split()[1:]:
+                    # forms v, v/vt, v//vn, v/vt/vn
+                    index = int(value.split("/", 1)[0])
+                    if index < 0:
+                        # relative to last vertex
+                        index += len(pool_indices)
+                    else:
+                        index -= 1
+                    face_indices.append(pool_indices[index])
+                welder.add_face(face_indices)
+    return welder.get_mesh()
+
+def _load_stl_ascii(filename, welder):
+    face_indices = []
+    with open(filename, "r") as infile:
+        for line in infile:
+            values = line.split()
+            if not values:
+                continue
+            if values[0] == "vertex":
+                (x, y, z) = (float(values[1]), float(values[2]), float(values[3]))
+                face_indices.append(welder.add_vertex((x, y, z), x, y, z))
+            elif values[0] == "endfacet":
+                welder.add_face(face_indices)
+                face_indices = []
+
+def _load_stl_binary(filename, welder):
+    with open(filename, "rb") as infile:
+        infile.read(STL_HEADER)
+        (count, ) = struct.unpack("<I", infile.read(4))
+        unpack_from = STL_RECORD.unpack_from
+        size = STL_RECORD.size
+        while count > 0:
+            chunk = infile.read(size * min(count, STL_CHUNK))
+            len_chunk = len(chunk) // size
+            if len_chunk == 0:
+                break
+            for offset in range(0, len_chunk * size, size):
+                values = unpack_from(chunk, offset)
+                # raw bytes of the three floats are the position key
+                welder.add_face((
+                    welder.add_vertex(chunk[offset + 12:offset + 24], values[3], values[4], values[5]),
+                    welder.add_vertex(chunk[offset + 24:offset + 36], values[6], values[7], values[8]),
+                    welder.add_vertex(chunk[offset + 36:offset + 48], values[9], values[10], values[11])))
+            count -= len_chunk
+
+def is_binary_stl(filename):
+    """
+    binary STL files have size 84 + 50 * number of triangles,
+    ASCII files start with solid, but some binary files do so too
+    """
+    size = os.path.getsize(filename)
+    if size < STL_HEADER + 4:
+        return False
+    with open(filename, "rb") as infile:
+        infile.read(STL_HEADER)
+        (count, ) = struct.unpack("<I", infile.read(4))
+    return size == STL_HEADER + 4 + count * STL_RECORD.size
+
+def load_stl(filename):
+    """
+    load ASCII or binary STL file and return indexed Mesh3D
+
+    binary files are read in chunks of STL_CHUNK triangles,
+    ASCII files line by line, the three vertices of every triangle
+    are welded with equal vertices of other triangles
+    """
+    welder = _Welder()
+    if is_binary_stl(filename):
+        _load_stl_binary(filename, welder)
+    else:
+        _load_stl_ascii(filename, welder)
+    return welder.get_mesh()
+
+def load_mesh(filename):
+    """load OBJ or STL file, depending on extension"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".obj":
+        return load_obj(filename)
+    elif extension == ".stl":
+        return load_stl(filename)
+    raise ValueError("unknown mesh file format %s" % extension)
@@ -3,9 +3,9 @@
 
 import math
 # own modules
+import Kernels3D
 from Vector3D import Vector3D as Vector3D
-from Polygon import Polygon as Polygon
-
+from VertexArray import VertexArray as VertexArray
 
 class Matrix3D(object):
 
@@ -83,10 +83,7 @@ class Matrix3D(object):
         | a3  b3  c3  d3 |     | c1  c2  c3  c4 |
         | a4  b4  c4  d4 |     | d1  d2  d3  d4 |
         """
-        new_data = []
-        for colnum in range(4):
-           new_data.append(self.col(colnum))
-        return Matrix3D(new_data)
+        return Matrix3D(Kernels3D.transpose(self.__data))
 
     def dot(self, other):
         """
@@ -102,13 +99,56 @@ class Matrix3D(object):
         | a41 | a42 | a43 | a44 |   | b41 | b42 | b43 | b44 |   |                                     |
         """
         assert isinstance(other, Matrix3D)
-        ret_matrix = self.zeros()
-        for rownum in range(4):
-            row_vec = Vector3D.from_list(self.row(rownum))
-            for colnum in range(4):
-                col_vec = Vector3D.from_list(other.col(colnum))
-                ret_matrix[rownum][colnum] = row_vec.dot(col_vec)
-        return ret_matrix
+        if self.is_affine() and other.is_affine():
+            return Matrix3D(Kernels3D.dot_affine(self.__data, other.__data))
+        return Matrix3D(Kernels3D.dot(self.__data, other.__data))
+
+    def is_affine(self):
+        """True if last row is 0, 0, 0, 1, so self does no projection"""
+        row = self.__data[3]
+        return row[0] == 0 and row[1] == 0 and row[2] == 0 and row[3] == 1
+
+    @classmethod
+    def compose(cls, *matrices):
+        """
+        return product of all matrices, same as
+        matrices[0].dot(matrices[1]).dot(matrices[2]) ...
+
+        product of affine matrices is affine, so runs of consecutive
+        affine matrices are multiplied first with the 3 x 4 kernel,
+        only the remaining products need the full 4 x 4 kernel,
+        no Matrix3D objects are created in between
+        """
+        if not matrices:
+            return cls.identity()
+        # list of tuples (data, affine)
+        reduced = []
+        for matrix in matrices:
+            affine = matrix.is_affine()
+            if affine and reduced and reduced[-1][1]:
+                reduced[-1] = (Kernels3D.dot_affine(reduced[-1][0], matrix.__data), True)
+            else:
+                reduced.append((matrix.__data, affine))
+        data = reduced[0][0]
+        for (other, _) in reduced[1:]:
+            data = Kernels3D.dot(data, other)
+        if data is matrices[0].__data:
+            data = [list(row) for row in data]
+        return cls(data)
+
+    @classmethod
+    def dot_pairwise(cls, matrices1, matrices2):
+        """
+        return list of products matrices1[n].dot(matrices2[n])
+        either argument may also be a single Matrix3D, which is
+        then multiplied with every matrix of the other list
+        """
+        if isinstance(matrices1, Matrix3D):
+            matrices1 = [matrices1] * len(matrices2)
+        elif isinstance(matrices2, Matrix3D):
+            matrices2 = [matrices2] * len(matrices1)
+        assert len(matrices1) == len(matrices2)
+        return [matrix1.dot(matrix2) for (matrix1, matrix2) in zip(matrices1, matrices2)]
 
     def v_dot(self, vector):
         """
@@ -120,11 +160,62 @@ class Matrix3D(object):
         | a4 | b4 | c4 | d4 |   | h |   | a4*x + b4*y + c4*z + d4*h |
         """
         assert isinstance(vector, Vector3D)
-        ret_data = [0, 0, 0, 0]
-        for index in range(4):
-            row_vec = Vector3D.from_list(self.__data[index])
-            ret_data[index] = row_vec.dot(vector)
-        return Vector3D.from_list(ret_data)
+        return Vector3D(*Kernels3D.v_dot(self.__data, vector.x, vector.y, vector.z, vector.h))
+
+    def transform_many(self, vertices):
+        """
+        apply self to every vertex in vertices, like v_dot but batched
+
+        vertices is a iterable of Vector3D objects, or anything else
+        unpackable into (x, y, z, h)
+        returns list of new Vector3D objects
+
+        if vertices is a VertexArray, a new VertexArray is returned
+        and no Vector3D objects are created at all
+
+        the 16 matrix coefficients are read only once per call,
+        not once per vertex
+        """
+        if isinstance(vertices, VertexArray):
+            return vertices.transform(self)
+        ((a1, b1, c1, d1),
+         (a2, b2, c2, d2),
+         (a3, b3, c3, d3),
+         (a4, b4, c4, d4)) = self.__data
+        ret_data = []
+        append = ret_data.append
+        for x, y, z, h in vertices:
+            append(Vector3D(
+                a1 * x + b1 * y + c1 * z + d1 * h,
+                a2 * x + b2 * y + c2 * z + d2 * h,
+                a3 * x + b3 * y + c3 * z + d3 * h,
+                a4 * x + b4 * y + c4 * z + d4 * h))
+        return ret_data
+
+    def transform_into(self, src, dst, start=0, stop=None):
+        """
+        apply self to vertices stored in flat buffer src and write
+        results to preallocated flat buffer dst
+
+        buffers are flat sequences of x, y, z, h, x, y, z, h, ...
+        like list or array.array("d"), dst must be at least as long as src
+        start and stop are vertex indices, not buffer indices,
+        to transform only part of the buffer
+
+        src and dst may be the same buffer, to transform inplace
+        no python objects are created per vertex, the generated kernel
+        for the kind of self skips all multiplications by 0 and 1
+        """
+        if stop is None:
+            stop = len(src) // 4
+        return Kernels3D.TRANSFORM_INTO[self.get_kind()](self.__data, src, dst, start, stop)
+
+    def get_kind(self):
+        """
+        return kind of transformation, one of translation, scale,
+        linear, affine or projective, see Kernels3D
+        """
+        return Kernels3D.get_kind(self.__data)
 
     def det(self):
         """
@@ -213,15 +304,31 @@ class Matrix3D(object):
         z[3,3] = m01*m12*m20 - m02*m11*m20 + m02*m10*m21 - m00*m12*m21 - m01*m10*m22 + m00*m11*m22
         return z.scale(1/self.det())
 
+    def get_normal_matrix(self):
+        """
+        return cofactor matrix of upper 3 x 3 part as tuple of 3 rows,
+        this is the inverse transpose scaled by the determinant
+
+        a normal n = e1 x e2 of edges e1, e2 transforms to
+        (M e1) x (M e2) = cofactor(M) n, so the transformed normal is
+        exactly the cross product of the transformed edges, with the
+        same length and orientation, even for singular matrices
+        18 multiplications, not cached, Face3D.transform calculates
+        it once and passes it on with the pending matrix
+        """
+        ((a0, b0, c0, _), (a1, b1, c1, _), (a2, b2, c2, _)) = self.__data[:3]
+        # rows are cross products of the other two rows
+        return (
+            (b1 * c2 - c1 * b2, c1 * a2 - a1 * c2, a1 * b2 - b1 * a2),
+            (b2 * c0 - c2 * b0, c2 * a0 - a2 * c0, a2 * b0 - b2 * a0),
+            (b0 * c1 - c0 * b1, c0 * a1 - a0 * c1, a0 * b1 - b0 * a1))
+
     def scale(self, scalar):
         """
         scale matrix by scalar
         return new Matrix3D
         """
-        new_array = []
-        for row in self.__data:
-            new_array.append([value * scalar for value in row])
-        return Matrix3D(new_array)
+        return Matrix3D(Kernels3D.scale(self.__data, scalar))
 
     @classmethod
     def get_rot_x_matrix(cls, theta):
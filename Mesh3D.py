@@ -2,30 +2,246 @@
 # -*- coding: utf-8 -*-
 
 import math
+from array import array
+import Profiler3D
+import Backend3D
+import Camera3D
 from Face3D import Face3D as Face3D
 from Matrix3D import Matrix3D as Matrix3D
 from Vector3D import Vector3D as Vector3D
+from VertexArray import VertexArray as VertexArray
+from Bounds3D import BoundingBox3D as BoundingBox3D
+from Bounds3D import BoundingSphere3D as BoundingSphere3D
+
+# vertices nearer than this are welded to one vertex
+WELD_DIGITS = 9
+
+def _normalized(x, y, z):
+    """return tuple (x, y, z) of length 1, or of zeros"""
+    length = math.sqrt(x * x + y * y + z * z)
+    if length == 0.0:
+        return (0.0, 0.0, 0.0)
+    return (x / length, y / length, z / length)
 
 class Mesh3D(object):
     """
-    this polygon consists of n-vertices
-    stores a number prefereable 3 or 4 of (triangle or rectangle)
-    numpy ndarray verctor
-    with dimension 3 or 4 (homogeneous)
+    indexed mesh of faces
+
+    all unique vertices of the mesh are stored once in a shared
+    VertexArray, every face only references vertices by index
+
+    vertices : VertexArray of unique vertices
+    indices  : array("i") of all face indices one after another
+    offsets  : array("i") of len_faces + 1 entries,
+               face n uses indices[offsets[n]:offsets[n + 1]]
     """
 
     def __init__(self, faces):
         """
-        vertices is a list of Vector3D objects
+        faces is a list of Face3D objects,
+        equal vertices of different faces are welded together
         """
-        # vertices should be list of Vector3D objects
+        # faces should be list of Face3D objects
         assert all((isinstance(face, Face3D) for face in faces))
-        self.faces = faces
-        self.len_faces = len(faces)
+        vertices = VertexArray()
+        indices = array("i")
+        offsets = array("i", [0])
+        lookup = {}
+        for face in faces:
+            for vertice in face.vertices:
+                key = tuple((round(value, WELD_DIGITS) for value in vertice))
+                index = lookup.get(key)
+                if index is None:
+                    index = len(vertices)
+                    lookup[key] = index
+                    vertices.append(vertice)
+                indices.append(index)
+            offsets.append(len(indices))
+        self._set_indexed(vertices, indices, offsets)
+
+    @classmethod
+    def from_indexed(cls, vertices, indices, offsets, matrix=None):
+        """
+        create Mesh3D directly from shared vertex pool and index buffers,
+        see class documentation, buffers are not copied
+
+        matrix is a optional pending transformation of vertices
+        """
+        mesh = cls.__new__(cls)
+        mesh._set_indexed(vertices, indices, offsets, matrix)
+        return mesh
+
+    @classmethod
+    def from_face_indices(cls, vertices, face_indices):
+        """
+        create Mesh3D from vertex pool and one sequence of vertex indices
+        per face, like ((0, 1, 2), (0, 2, 3))
+        """
+        indices = array("i")
+        offsets = array("i", [0])
+        for face in face_indices:
+            indices.extend(face)
+            offsets.append(len(indices))
+        return cls.from_indexed(vertices, indices, offsets)
+
+    def _set_indexed(self, vertices, indices, offsets, matrix=None):
+        if not isinstance(vertices, VertexArray):
+            vertices = VertexArray.from_vectors(vertices)
+        vertices = Backend3D.vertex_array(vertices)
+        self.indices = indices
+        self.offsets = offsets
+        self.len_faces = len(offsets) - 1
+        self.__faces = None
+        self.__base = vertices
+        self.__matrix = matrix
+        self.__vertices = vertices if matrix is None else None
+        # vertex pool is shared with meshes returned by transform
+        self.__shared = False
+        # number of calls of set_vertex, see get_version
+        self.__version = 0
+        # bounds are derived from bounds of base mesh, if there is one,
+        # and if base mesh is still the same version
+        self.__base_mesh = None
+        self.__base_matrix = None
+        self.__base_version = 0
+        self.__box = None
+        self.__sphere = None
+        # depends only on indices, shared with transformed meshes
+        self.__vertex_faces = None
+        self.__area_normals = None
+        self.__vertex_normals = None
+        self.__changed_vertices = set()
+
+    @property
+    def vertices(self):
+        """
+        VertexArray of unique vertices,
+        a pending transformation is applied once on first access
+        """
+        if self.__matrix is not None:
+            self.resolve()
+        return self.__vertices
+
+    def resolve(self, transform=None):
+        """
+        apply pending transformation now, returns self
+
+        transform is a optional callable (vertices, matrix) returning
+        the transformed VertexArray, like Parallel3D.ParallelTransformer,
+        defaults to VertexArray.transform
+        """
+        if self.__matrix is None:
+            return self
+        with Profiler3D.stage("transform"):
+            if transform is None:
+                self.__vertices = self.__base.transform(self.__matrix)
+            else:
+                self.__vertices = Backend3D.vertex_array(transform(self.__base, self.__matrix))
+        Profiler3D.count("vertices_transformed", len(self.__vertices))
+        self.__base = None
+        self.__matrix = None
+        return self
+
+    def get_pending_matrix(self):
+        """
+        return transformation not yet applied to vertices,
+        or None if vertices are up to date
+        """
+        return self.__matrix
+
+    @property
+    def faces(self):
+        """
+        list of Face3D objects,
+        created on first access from vertex pool and indices
+        """
+        if self.__faces is None:
+            vertices = self.vertices
+            Profiler3D.count("faces_created", self.len_faces)
+            self.__faces = [Face3D(vertices.take(self.get_face_indices(index))) for index in range(self.len_faces)]
+        return self.__faces
+
+    def get_face(self, index):
+        """
+        return Face3D with index, without creating all other faces
+        """
+        if self.__faces is not None:
+            return self.__faces[index]
+        Profiler3D.count("faces_created")
+        return Face3D(self.vertices.take(self.get_face_indices(index)))
+
+    def set_vertex(self, index, vector):
+        """
+        overwrite vertex at index in vertex pool
+        cached faces and bounds are invalidated
+
+        if the vertex pool is shared with meshes returned by
+        transform, it is copied before, so these meshes and their
+        bounds keep the vertices at the time of transform
+        vertex normals are updated on next access, see get_vertex_normals
+        """
+        vertices = self.vertices
+        if self.__shared:
+            vertices = self.__vertices = vertices.copy()
+            self.__shared = False
+        vertices[index] = vector
+        self.__version += 1
+        if self.__vertex_normals is not None:
+            self.__changed_vertices.add(index)
+        self.__faces = None
+        self.__base_mesh = None
+        self.__base_matrix = None
+        self.__box = None
+        self.__sphere = None
+
+    def get_bounding_box(self):
+        """
+        return axis aligned BoundingBox3D around all vertices
+
+        calculated once and cached, for transformed meshes the box
+        of the original mesh is transformed, which does not need to
+        touch, or apply pending transformations to, any vertex
+        """
+        if self.__box is None:
+            if self.__get_base_mesh() is not None:
+                self.__box = self.__base_mesh.get_bounding_box().transform(self.__base_matrix)
+            else:
+                self.__box = BoundingBox3D.from_vertices(self.vertices)
+        return self.__box
+
+    def get_bounding_sphere(self):
+        """
+        return BoundingSphere3D around all vertices
+        cached like get_bounding_box
+        """
+        if self.__sphere is None:
+            if self.__get_base_mesh() is not None:
+                self.__sphere = self.__base_mesh.get_bounding_sphere().transform(self.__base_matrix)
+            else:
+                self.__sphere = BoundingSphere3D.from_vertices(self.vertices)
+        return self.__sphere
+
+    def get_version(self):
+        """return number of changes by set_vertex, to detect mutations"""
+        return self.__version
+
+    def __get_base_mesh(self):
+        """return base mesh of bounds, None if it changed since transform"""
+        if self.__base_mesh is not None and self.__base_mesh.__version != self.__base_version:
+            self.__base_mesh = None
+            self.__base_matrix = None
+        return self.__base_mesh
+
+    def get_face_indices(self, index):
+        """return vertex indices of face with index"""
+        return self.indices[self.offsets[index]:self.offsets[index + 1]]
 
     def __getitem__(self, key):
         return self.faces[key]
 
+    def __len__(self):
+        return self.len_faces
+
 #    def get_avg_z(self):
 #        """return average z of vertices"""
 #        return sum((vector.z for vector in vertices)) / len(self.vertices)
@@ -36,11 +252,333 @@ class Mesh3D(object):
         technically for every vertice in vertices do
 
         new_vertice = vertice DOT matrix
+
+        every unique vertex is transformed exactly once,
+        the index buffers are shared with the new Mesh3D
+
+        the transformation is lazy, chained transformations like
+        mesh.transform(rot).transform(scale).transform(shift)
+        are combined to one matrix, which is applied to the vertices
+        only once, when vertices or faces of the result are read
+        """
+        if self.__matrix is None:
+            mesh = Mesh3D.from_indexed(self.__vertices, self.indices, self.offsets, matrix)
+            self.__shared = True
+        else:
+            mesh = Mesh3D.from_indexed(self.__base, self.indices, self.offsets, matrix.dot(self.__matrix))
+        if self.__get_base_mesh() is None:
+            mesh.__base_mesh = self
+            mesh.__base_matrix = matrix
+            mesh.__base_version = self.__version
+        else:
+            mesh.__base_mesh = self.__base_mesh
+            mesh.__base_matrix = matrix.dot(self.__base_matrix)
+            mesh.__base_version = self.__base_version
+        mesh.__vertex_faces = self.__vertex_faces
+        return mesh
+
+    def get_face_normals(self):
+        """
+        return list of normals (x, y, z) of all faces, not normalized
+
+        calculated in one pass over the index buffer, like
+        Face3D._get_normal_faster from first three vertices of every face
+        without creating Face3D objects, vectorised with numpy backend
+        """
+        with Profiler3D.stage("normals"):
+            vertices = self.vertices
+            if Backend3D.is_numpy(vertices):
+                normals = Backend3D.get_face_normals(vertices.values, self.indices, self.offsets)
+                normals = [tuple(normal) for normal in normals.tolist()]
+            else:
+                normals = self._get_face_normals(vertices.data)
+        Profiler3D.count("face_normals", self.len_faces)
+        return normals
+
+    def _get_face_normals(self, data):
+        """python backend of get_face_normals"""
+        indices = self.indices
+        offsets = self.offsets
+        normals = []
+        append = normals.append
+        for face_index in range(self.len_faces):
+            offset = offsets[face_index]
+            index0 = 4 * indices[offset]
+            index1 = 4 * indices[offset + 1]
+            index2 = 4 * indices[offset + 2]
+            v1_x = data[index0] - data[index1]
+            v1_y = data[index0 + 1] - data[index1 + 1]
+            v1_z = data[index0 + 2] - data[index1 + 2]
+            v2_x = data[index0] - data[index2]
+            v2_y = data[index0 + 1] - data[index2 + 1]
+            v2_z = data[index0 + 2] - data[index2 + 2]
+            append((
+                v1_y * v2_z - v1_z * v2_y,
+                v1_z * v2_x - v1_x * v2_z,
+                v1_x * v2_y - v1_y * v2_x))
+        return normals
+
+    def get_vertex_faces(self):
+        """
+        return vertex to face adjacency as tuple (faces, vertex_offsets)
+        of array("i"), indices of all faces around vertex n are
+        faces[vertex_offsets[n]:vertex_offsets[n + 1]], ascending
+
+        built once in two passes over the index buffer, like a
+        counting sort, and shared with meshes returned by transform
+        """
+        if self.__vertex_faces is None:
+            indices = self.indices
+            offsets = self.offsets
+            len_vertices = len(self.__vertices if self.__matrix is None else self.__base)
+            # count faces of every vertex, then start of every vertex
+            vertex_offsets = array("i", [0]) * (len_vertices + 1)
+            for index in indices:
+                vertex_offsets[index + 1] += 1
+            for index in range(len_vertices):
+                vertex_offsets[index + 1] += vertex_offsets[index]
+            faces = array("i", [0]) * len(indices)
+            positions = array("i", vertex_offsets)
+            for face_index in range(self.len_faces):
+                for index in indices[offsets[face_index]:offsets[face_index + 1]]:
+                    faces[positions[index]] = face_index
+                    positions[index] += 1
+            self.__vertex_faces = (faces, vertex_offsets)
+        return self.__vertex_faces
+
+    def _set_area_normals(self, face_indices):
+        """
+        calculate area normals of faces with face_indices,
+        like Face3D.get_area_normal, in flat buffer of x, y, z per face
+        """
+        data = self.vertices.data
+        indices = self.indices
+        offsets = self.offsets
+        normals = self.__area_normals
+        for face_index in face_indices:
+            start = offsets[face_index]
+            stop = offsets[face_index + 1]
+            x = y = z = 0.0
+            index = 4 * indices[stop - 1]
+            (x1, y1, z1) = (data[index], data[index + 1], data[index + 2])
+            for index in indices[start:stop]:
+                index *= 4
+                (x2, y2, z2) = (data[index], data[index + 1], data[index + 2])
+                x += y1 * z2 - z1 * y2
+                y += z1 * x2 - x1 * z2
+                z += x1 * y2 - y1 * x2
+                (x1, y1, z1) = (x2, y2, z2)
+            index = 3 * face_index
+            normals[index] = x
+            normals[index + 1] = y
+            normals[index + 2] = z
+
+    def get_vertex_normals(self):
+        """
+        return list of unit normals (x, y, z), one for every vertex,
+        for smooth shading
+
+        the normal of a vertex is the sum of the normals of all faces
+        around it, weighted by face area, see Face3D.get_area_normal
+        vertices without area around them get (0.0, 0.0, 0.0)
+
+        the first call accumulates all face normals in one pass over
+        the faces, vectorised with numpy backend, later calls only
+        update vertices around vertices changed by set_vertex,
+        see update_vertex_normals
+        returns a new list on every call
+        """
+        if self.__vertex_normals is None:
+            with Profiler3D.stage("normals"):
+                vertices = self.vertices
+                if Backend3D.is_numpy(vertices):
+                    (area_normals, vertex_normals) = Backend3D.get_vertex_normals(vertices.values, self.indices, self.offsets)
+                    self.__area_normals = array("d", area_normals.ravel().tolist())
+                    self.__vertex_normals = [tuple(normal) for normal in vertex_normals.tolist()]
+                else:
+                    self.__vertex_normals = self._get_vertex_normals(len(vertices))
+                self.__changed_vertices.clear()
+            Profiler3D.count("vertex_normals", len(self.__vertex_normals))
+        elif self.__changed_vertices:
+            self.update_vertex_normals(())
+        return list(self.__vertex_normals)
+
+    def _get_vertex_normals(self, len_vertices):
+        """python backend of get_vertex_normals"""
+        self.__area_normals = array("d", [0.0]) * (3 * self.len_faces)
+        self._set_area_normals(range(self.len_faces))
+        normals = self.__area_normals
+        indices = self.indices
+        offsets = self.offsets
+        sums = array("d", [0.0]) * (3 * len_vertices)
+        for face_index in range(self.len_faces):
+            (x, y, z) = normals[3 * face_index:3 * face_index + 3]
+            for index in indices[offsets[face_index]:offsets[face_index + 1]]:
+                index *= 3
+                sums[index] += x
+                sums[index + 1] += y
+                sums[index + 2] += z
+        return [_normalized(sums[index], sums[index + 1], sums[index + 2]) for index in range(0, len(sums), 3)]
+
+    def update_vertex_normals(self, vertex_indices):
         """
-        new_faces = []
-        for face in self.faces:
-            new_faces.append(face.transform(matrix))
-        return Mesh3D(new_faces)
+        update vertex normals after vertices with vertex_indices changed,
+        needed only if vertices are changed directly, not by set_vertex
+
+        only faces around changed vertices, and vertices of these faces
+        are recalculated, found by get_vertex_faces
+        returns a new list of normals, like get_vertex_normals
+        """
+        if self.__vertex_normals is None:
+            return self.get_vertex_normals()
+        # including vertices changed by set_vertex
+        vertex_indices = self.__changed_vertices.union(vertex_indices)
+        with Profiler3D.stage("normals"):
+            (faces, vertex_offsets) = self.get_vertex_faces()
+            face_indices = set()
+            for index in vertex_indices:
+                face_indices.update(faces[vertex_offsets[index]:vertex_offsets[index + 1]])
+            self._set_area_normals(face_indices)
+            affected = vertex_indices
+            for face_index in face_indices:
+                affected.update(self.get_face_indices(face_index))
+            normals = self.__area_normals
+            vertex_normals = self.__vertex_normals
+            for index in affected:
+                x = y = z = 0.0
+                for face_index in faces[vertex_offsets[index]:vertex_offsets[index + 1]]:
+                    face_index *= 3
+                    x += normals[face_index]
+                    y += normals[face_index + 1]
+                    z += normals[face_index + 2]
+                vertex_normals[index] = _normalized(x, y, z)
+            self.__changed_vertices.clear()
+        Profiler3D.count("vertex_normals", len(affected))
+        return list(vertex_normals)
+
+    def get_depth_keys(self, matrix=None):
+        """
+        return list of depth keys, one for every face
+
+        key is the average z of the face vertices, calculated in one
+        pass over the index buffer
+        if matrix is given, like Camera3D.get_view_matrix(), key is the
+        average z after transformation with matrix, without
+        transforming any vertex, average of transformed vertices is the
+        transformation of the average vertex
+        """
+        if matrix is None:
+            (row_x, row_y, row_z, row_h) = (0.0, 0.0, 1.0, 0.0)
+        else:
+            (row_x, row_y, row_z, row_h) = matrix[2]
+        vertices = self.vertices
+        if Backend3D.is_numpy(vertices):
+            return Backend3D.get_depth_keys(vertices.values, self.indices, self.offsets, (row_x, row_y, row_z, row_h)).tolist()
+        data = vertices.data
+        indices = self.indices
+        offsets = self.offsets
+        keys = []
+        append = keys.append
+        for face_index in range(self.len_faces):
+            start = offsets[face_index]
+            stop = offsets[face_index + 1]
+            sum_x = sum_y = sum_z = sum_h = 0.0
+            for index in indices[start:stop]:
+                index *= 4
+                sum_x += data[index]
+                sum_y += data[index + 1]
+                sum_z += data[index + 2]
+                sum_h += data[index + 3]
+            append((row_x * sum_x + row_y * sum_y + row_z * sum_z + row_h * sum_h) / (stop - start))
+        return keys
+
+    def sort_faces(self, matrix=None):
+        """
+        return list of face indices sorted back to front,
+        farthest face first, for painters algorithm
+        see get_depth_keys, for frame by frame sorting see DepthSort3D
+        """
+        keys = self.get_depth_keys(matrix)
+        return sorted(range(self.len_faces), key=keys.__getitem__, reverse=True)
+
+    def cull_backfaces(self, eye, face_indices=None):
+        """
+        return list of indices of faces facing to eye
+
+        eye is the camera position in the same coordinate system as
+        the vertices, see Camera3D.get_eye
+        face is facing to eye, if the angle between face normal
+        and the vector from face to eye is below 90 degrees,
+        so if dot product of these two is positive
+        """
+        vertices = self.vertices
+        if Backend3D.is_numpy(vertices):
+            return Backend3D.select(face_indices, Backend3D.get_facing(vertices.values, self.indices, self.offsets, eye))
+        data = vertices.data
+        indices = self.indices
+        offsets = self.offsets
+        normals = self.get_face_normals()
+        (eye_x, eye_y, eye_z) = (eye[0], eye[1], eye[2])
+        if face_indices is None:
+            face_indices = range(self.len_faces)
+        visible = []
+        for face_index in face_indices:
+            (normal_x, normal_y, normal_z) = normals[face_index]
+            index0 = 4 * indices[offsets[face_index]]
+            if normal_x * (eye_x - data[index0]) + normal_y * (eye_y - data[index0 + 1]) + normal_z * (eye_z - data[index0 + 2]) > 0:
+                visible.append(face_index)
+        return visible
+
+    def cull_frustum(self, camera, face_indices=None):
+        """
+        return list of indices of faces not entirely outside the
+        view frustum of camera
+
+        face is outside, if all of its vertices are outside of
+        the same clipping plane, so the bitwise and of their outcodes is
+        not zero, see Camera3D.get_outcodes
+        if the bounding box of the whole mesh is outside,
+        no vertex and no face is tested at all
+        """
+        if self.len_faces == 0 or len(self.vertices) == 0:
+            # no bounding box around nothing
+            return []
+        mesh_code = -1
+        for code in camera.get_outcodes(self.get_bounding_box().get_corners()):
+            mesh_code &= code
+        if mesh_code:
+            return []
+        vertices = self.vertices
+        if Backend3D.is_numpy(vertices):
+            outside = Backend3D.get_outside(vertices.values, self.indices, self.offsets, camera.get_matrix(), Camera3D.OUT_BITS)
+            return Backend3D.select(face_indices, ~outside)
+        outcodes = camera.get_outcodes(vertices)
+        indices = self.indices
+        offsets = self.offsets
+        if face_indices is None:
+            face_indices = range(self.len_faces)
+        visible = []
+        for face_index in face_indices:
+            code = -1
+            for index in indices[offsets[face_index]:offsets[face_index + 1]]:
+                code &= outcodes[index]
+            if code == 0:
+                visible.append(face_index)
+        return visible
+
+    def cull(self, camera):
+        """
+        return list of indices of visible faces,
+        faces outside the view frustum and back faces are removed
+        """
+        with Profiler3D.stage("cull"):
+            visible = self.cull_backfaces(camera.get_eye(), self.cull_frustum(camera))
+        Profiler3D.count("faces_culled", self.len_faces - len(visible))
+        return visible
+
+    def get_visible_faces(self, camera):
+        """return list of Face3D objects visible from camera, see cull"""
+        return [self.get_face(index) for index in self.cull(camera)]
 
 #    def projected_old(self, shift_x, shift_y):
 #        """
@@ -0,0 +1,96 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+import mmap
+import ctypes
+import struct
+from array import array
+# own modules
+import Backend3D
+import Loaders3D
+from Mesh3D import Mesh3D as Mesh3D
+from VertexArray import VertexArray as VertexArray
+
+# binary mesh cache file, all values little endian
+#
+# offset  size
+#      0     8  magic
+#      8     4  uint32 version
+#     12     4  uint32 reserved
+#     16     8  uint64 number of vertices
+#     24     8  uint64 number of indices
+#     32     8  uint64 number of faces
+#     40    24  padding
+#     64        float64 x, y, z, h of every vertex
+#               int32 indices
+#               int32 offsets, number of faces + 1
+MAGIC = b"PY3DMESH"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQ24x")
+
+def save_mesh_cache(mesh, filename):
+    """write geometry of Mesh3D to binary cache file"""
+    vertices = Backend3D.as_array(mesh.vertices)
+    indices = array("i", mesh.indices)
+    offsets = array("i", mesh.offsets)
+    if sys.byteorder != "little":
+        for section in (vertices, indices, offsets):
+            section.byteswap()
+    with open(filename, "wb") as outfile:
+        outfile.write(HEADER.pack(MAGIC, VERSION, 0, len(vertices) // 4, len(indices), len(offsets) - 1))
+        for section in (vertices, indices, offsets):
+            section.tofile(outfile)
+
+def load_mesh_cache(filename):
+    """
+    open binary cache file and return Mesh3D
+
+    the file is memory mapped copy on write, vertex and index buffers
+    are ctypes arrays directly on top of the mapping, so nothing is parsed
+    or copied, pages are loaded on first access and are shared
+    with every other process mapping the same file, until written to
+    """
+    with open(filename, "rb") as infile:
+        header = infile.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("%s is no mesh cache file" % filename)
+        (magic, version, _, len_vertices, len_indices, len_faces) = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("%s is no mesh cache file" % filename)
+        if version != VERSION:
+            raise ValueError("mesh cache file %s has unsupported version %d" % (filename, version))
+        if sys.byteorder != "little":
+            # no zero copy possible, read and swap
+            vertices = array("d")
+            vertices.fromfile(infile, 4 * len_vertices)
+            indices = array("i")
+            indices.fromfile(infile, len_indices)
+            offsets = array("i")
+            offsets.fromfile(infile, len_faces + 1)
+            for section in (vertices, indices, offsets):
+                section.byteswap()
+            return Mesh3D.from_indexed(VertexArray(vertices), indices, offsets)
+        mapping = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_COPY)
+    position = HEADER.size
+    vertices = (ctypes.c_double * (4 * len_vertices)).from_buffer(mapping, position)
+    position += ctypes.sizeof(vertices)
+    indices = (ctypes.c_int32 * len_indices).from_buffer(mapping, position)
+    position += ctypes.sizeof(indices)
+    offsets = (ctypes.c_int32 * (len_faces + 1)).from_buffer(mapping, position)
+    return Mesh3D.from_indexed(VertexArray(vertices), indices, offsets)
+
+def load_mesh_cached(filename, cache_filename=None):
+    """
+    load mesh file with Loaders3D.load_mesh only the first time,
+    later on from cache file, if the cache is newer than filename
+    cache_filename defaults to filename + ".cache"
+    """
+    if cache_filename is None:
+        cache_filename = filename + ".cache"
+    if os.path.exists(cache_filename) and os.path.getmtime(cache_filename) >= os.path.getmtime(filename):
+        return load_mesh_cache(cache_filename)
+    mesh = Loaders3D.load_mesh(filename)
+    save_mesh_cache(mesh, cache_filename)
+    return mesh
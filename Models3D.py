@@ -7,6 +7,7 @@ from Mesh3D import Mesh3D as Mesh3D
 from Face3D import Face3D as Face3D
 from Matrix3D import Matrix3D as Matrix3D
 from Vector3D import Vector3D as Vector3D
+from Quaternion import Quaternion as Quaternion
 
 def get_rectangle_points():
     """basic rectangle vertices"""
@@ -53,29 +54,67 @@ def get_pyramid_mesh():
     faces.append(face)
     return Mesh3D(faces)
 
+def get_cube_points():
+    """the eight unique corners of the unit cube"""
+    points = (
+        Vector3D(-1, -1, -1, 1),
+        Vector3D( 1, -1, -1, 1),
+        Vector3D( 1,  1, -1, 1),
+        Vector3D(-1,  1, -1, 1),
+        Vector3D(-1, -1,  1, 1),
+        Vector3D( 1, -1,  1, 1),
+        Vector3D( 1,  1,  1, 1),
+        Vector3D(-1,  1,  1, 1),
+    )
+    return points
+
 def get_cube_mesh():
-    # a cube Mesh consist of six Faces
-    # left
-    faces = []
-    rec = Face3D(get_rectangle_points())
-    t = Matrix3D.get_shift_matrix(-1, 0, 0).dot(Matrix3D.get_rot_y_matrix(math.pi/2))
-    faces.append(rec.transform(t))
-    # right
-    t = Matrix3D.get_shift_matrix(1, 0, 0).dot(Matrix3D.get_rot_y_matrix(math.pi/2))
-    faces.append(rec.transform(t))
-    # bottom
-    t = Matrix3D.get_shift_matrix(0, -1, 0).dot(Matrix3D.get_rot_x_matrix(math.pi/2))
-    faces.append(rec.transform(t))
-    # top
-    t = Matrix3D.get_shift_matrix(0, 1, 0).dot(Matrix3D.get_rot_x_matrix(math.pi/2))
-    faces.append(rec.transform(t))
-    # front
-    t = Matrix3D.get_shift_matrix(0, 0, -1)
-    faces.append(rec.transform(t))
-    # back
-    t = Matrix3D.get_shift_matrix(0, 0, 1)
-    faces.append(rec.transform(t))
-    return Mesh3D(faces)
+    """
+    a cube Mesh consist of six Faces, sharing eight vertices
+    every face is counter clockwise seen from outside,
+    so face normals point outwards
+    """
+    face_indices = (
+        (0, 4, 7, 3), # left
+        (1, 2, 6, 5), # right
+        (0, 1, 5, 4), # bottom
+        (3, 7, 6, 2), # top
+        (0, 3, 2, 1), # front
+        (4, 5, 6, 7), # back
+    )
+    return Mesh3D.from_face_indices(get_cube_points(), face_indices)
+
+def get_sphere_mesh(slices=16, stacks=8, radius=1.0):
+    """
+    UV sphere Mesh, centered at origin
+
+    slices around Y-Axis, stacks from bottom to top,
+    both poles are single shared vertices, faces at poles are triangles,
+    all others rectangles, face normals point outwards
+    slices * (stacks - 1) + 2 vertices, slices * stacks faces
+    """
+    vertices = [Vector3D(0.0, -radius, 0.0, 1.0)]
+    for stack in range(1, stacks):
+        phi = math.pi * stack / stacks - math.pi / 2
+        ring_y = radius * math.sin(phi)
+        ring_radius = radius * math.cos(phi)
+        for index in range(slices):
+            theta = 2 * math.pi * index / slices
+            vertices.append(Vector3D(ring_radius * math.cos(theta), ring_y, ring_radius * math.sin(theta), 1.0))
+    vertices.append(Vector3D(0.0, radius, 0.0, 1.0))
+    top = len(vertices) - 1
+    def ring(stack, index):
+        """index of vertex in ring stack"""
+        return 1 + (stack - 1) * slices + index % slices
+    face_indices = []
+    for index in range(slices):
+        face_indices.append((0, ring(1, index), ring(1, index + 1)))
+    for stack in range(1, stacks - 1):
+        for index in range(slices):
+            face_indices.append((ring(stack, index), ring(stack + 1, index), ring(stack + 1, index + 1), ring(stack, index + 1)))
+    for index in range(slices):
+        face_indices.append((top, ring(stacks - 1, index + 1), ring(stacks - 1, index)))
+    return Mesh3D.from_face_indices(vertices, face_indices)
 
 def get_scale_rot_matrix(scale_tuple, aspect_tuple, shift_tuple):
     """
@@ -112,21 +151,20 @@ def get_rot_matrix(static_transformation, degrees, steps):
     static_transformation of type Matrix3d, will be applied to every step
     degrees of type tuple, for every axis one entry in degrees
     steps of type int, how many steps to precalculate
+
+    the rotation of every step is composed as Quaternion,
+    rotation around Y-Axis, then X-Axis, then Z-Axis, see Quaternion.from_euler
     """
     deg2rad = math.pi / 180
-    transformations = []
+    rotations = []
     for step in range(steps):
         factor = step * deg2rad
         angle_x = degrees[0] * factor
         angle_y = degrees[1] * factor
         angle_z = degrees[2] * factor
         # this part of tranformation is calculate for every step
-        transformation = get_rot_z_matrix(angle_z).dot(
-                get_rot_x_matrix(angle_x).dot(
-                    get_rot_y_matrix(angle_y)))
-        # combine with static part of transformation,
-        # which does scaling, shifting and aspect ration correction
-        # to get affine transformation matrix
-        transformation = static_transformation.dot(transformation)
-        transformations.append(transformation)
-    return transformations
+        rotations.append(Quaternion.from_euler(angle_x, angle_y, angle_z).to_matrix())
+    # combine with static part of transformation,
+    # which does scaling, shifting and aspect ration correction
+    # to get affine transformation matrix
+    return Matrix3D.dot_pairwise(static_transformation, rotations)
@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+parallel transformation of very large meshes
+
+the vertex buffer is copied once into a shared ctypes array,
+which is handed to a persistent pool of worker processes by the pool
+initializer, every worker applies the matrix to its own chunk of
+vertices in place, with Matrix3D.transform_into, only the 16 matrix
+coefficients and the chunk boundaries are sent to the workers,
+no geometry is pickled
+
+with only one process, or for meshes with less than MIN_VERTICES
+vertices the serial VertexArray.transform is used
+"""
+
+import ctypes
+import multiprocessing
+from multiprocessing import sharedctypes
+from array import array
+# own modules
+from Matrix3D import Matrix3D as Matrix3D
+from VertexArray import VertexArray as VertexArray
+
+# meshes with fewer vertices are transformed serially
+MIN_VERTICES = 100000
+# chunks per worker process, more chunks balance load better
+CHUNKS_PER_PROCESS = 4
+
+# in worker processes, shared array set once by _init_worker
+_shared = None
+
+def _init_worker(shared):
+    """pool initializer, keep shared ctypes array of vertex data"""
+    global _shared
+    _shared = shared
+
+def _transform_chunk(task):
+    """worker function, transform vertices start to stop in place"""
+    (rows, start, stop) = task
+    Matrix3D([list(row) for row in rows]).transform_into(_shared, _shared, start, stop)
+    return stop - start
+
+def _address(data):
+    """return address of flat float buffer, array.array or numpy array"""
+    try:
+        return data.buffer_info()[0]
+    except AttributeError:
+        return data.ctypes.data
+
+
+class ParallelTransformer(object):
+    """
+    transform vertices with a pool of worker processes
+
+    transformer = ParallelTransformer()
+    mesh = transformer.transform(mesh, matrix)
+
+    or as transform of a lazy transformed Mesh3D
+
+    mesh = mesh.transform(matrix).resolve(transformer)
+
+    the pool and the shared array are created on first use
+    and reused until close is called, for a larger mesh both are
+    created again
+    """
+
+    def __init__(self, processes=None, min_vertices=MIN_VERTICES):
+        """
+        processes defaults to number of cpus
+        min_vertices is the smallest number of vertices transformed in parallel
+        """
+        self.processes = processes or multiprocessing.cpu_count()
+        self.min_vertices = min_vertices
+        self.__pool = None
+        self.__shared = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+        return False
+
+    def close(self):
+        """stop worker processes and free shared array"""
+        if self.__pool is not None:
+            self.__pool.close()
+            self.__pool.join()
+            self.__pool = None
+        self.__shared = None
+
+    def is_parallel(self, len_vertices):
+        """True if len_vertices vertices would be transformed in parallel"""
+        return self.processes > 1 and len_vertices >= self.min_vertices
+
+    def __get_pool(self, length):
+        """
+        return pool of workers sharing a array of at least length floats,
+        the workers get the shared array only once, when they are started
+        """
+        if self.__shared is not None and len(self.__shared) < length:
+            self.close()
+        if self.__pool is None:
+            self.__shared = sharedctypes.RawArray("d", length)
+            self.__pool = multiprocessing.Pool(self.processes, _init_worker, (self.__shared, ))
+        return self.__pool
+
+    def transform_vertices(self, vertices, matrix):
+        """
+        return new VertexArray of vertices transformed by Matrix3D,
+        in parallel if there are enough vertices
+        """
+        len_vertices = len(vertices)
+        if not self.is_parallel(len_vertices):
+            return vertices.transform(matrix)
+        length = 4 * len_vertices
+        pool = self.__get_pool(length)
+        ctypes.memmove(self.__shared, _address(vertices.data), 8 * length)
+        rows = tuple((tuple(matrix[row]) for row in range(4)))
+        chunk = -(-len_vertices // (self.processes * CHUNKS_PER_PROCESS))
+        tasks = [(rows, start, min(start + chunk, len_vertices)) for start in range(0, len_vertices, chunk)]
+        pool.map(_transform_chunk, tasks)
+        data = array("d", [0.0]) * length
+        ctypes.memmove(data.buffer_info()[0], self.__shared, 8 * length)
+        return VertexArray(data)
+    __call__ = transform_vertices
+
+    def transform(self, mesh, matrix):
+        """
+        return Mesh3D transformed by matrix, like Mesh3D.transform,
+        but the transformation is applied at once, see Mesh3D.resolve
+        """
+        return mesh.transform(matrix).resolve(self)
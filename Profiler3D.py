@@ -0,0 +1,209 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+lightweight instrumentation of the render pipeline
+
+core modules report into this module
+stages   : named timers, like "transform", "cull", "project",
+           with Profiler3D.stage(name) as context manager,
+           stages may be nested, like "normals" inside "cull"
+counters : named numbers, like "vertices_transformed", "faces_culled",
+           with Profiler3D.count(name, value)
+
+everything is collected per frame, begin_frame and end_frame
+mark frame boundaries, finished frames are kept in a history of
+MAX_FRAMES frames and could be queried or dumped as JSON
+
+profiling is disabled by default, then stage returns a shared
+context manager doing nothing and count returns immediately,
+hot loops check ENABLED before doing any work for profiling
+
+with enable(trace_memory=True) every finished frame also records
+traced memory from tracemalloc, if available (python 3.4+)
+"""
+
+import json
+import timeit
+from collections import deque
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+# read by instrumented code, change only with enable and disable
+ENABLED = False
+TRACE_MEMORY = False
+# number of finished frames kept
+MAX_FRAMES = 1000
+
+_timer = timeit.default_timer
+_frames = deque(maxlen=MAX_FRAMES)
+_frame_number = 0
+_current = None
+# tracemalloc was started by enable, not by someone else
+_tracing = False
+
+def _new_frame():
+    """return empty frame statistics"""
+    return {
+        "frame": _frame_number,
+        "seconds": 0.0,
+        "stages": {},
+        "counters": {},
+        "_start": _timer(),
+    }
+
+def enable(trace_memory=False):
+    """
+    start profiling, statistics of former runs are discarded
+    trace_memory starts tracemalloc, ignored if not available
+    """
+    global ENABLED, TRACE_MEMORY, _tracing
+    reset()
+    ENABLED = True
+    TRACE_MEMORY = trace_memory and tracemalloc is not None
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _tracing = True
+
+def disable():
+    """stop profiling, collected statistics are kept"""
+    global ENABLED, TRACE_MEMORY, _tracing
+    ENABLED = False
+    if _tracing:
+        tracemalloc.stop()
+        _tracing = False
+    TRACE_MEMORY = False
+
+def reset():
+    """discard all statistics"""
+    global _current, _frame_number
+    _frames.clear()
+    _frame_number = 0
+    _current = _new_frame()
+
+
+class _Stage(object):
+    """context manager adding elapsed time to stage of current frame"""
+
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = _timer()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = _timer() - self.start
+        stages = _current["stages"]
+        stage = stages.get(self.name)
+        if stage is None:
+            stages[self.name] = {"seconds": elapsed, "calls": 1}
+        else:
+            stage["seconds"] += elapsed
+            stage["calls"] += 1
+        return False
+
+
+class _NullStage(object):
+    """context manager doing nothing, used if profiling is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+_NULL_STAGE = _NullStage()
+
+def stage(name):
+    """
+    return context manager timing the with block as stage name
+
+    with Profiler3D.stage("cull"):
+        ...
+    """
+    if not ENABLED:
+        return _NULL_STAGE
+    return _Stage(name)
+
+def count(name, value=1):
+    """add value to counter name of current frame"""
+    if not ENABLED:
+        return
+    counters = _current["counters"]
+    counters[name] = counters.get(name, 0) + value
+
+def begin_frame():
+    """start new frame, statistics collected so far belong to the last one"""
+    global _current
+    if ENABLED:
+        _current = _new_frame()
+
+def end_frame():
+    """
+    finish current frame, add it to history and start the next one
+    returns statistics of finished frame, see get_frame
+    or None if profiling is disabled
+    """
+    global _current, _frame_number
+    if not ENABLED:
+        return None
+    frame = _current
+    frame["seconds"] = _timer() - frame.pop("_start")
+    if TRACE_MEMORY:
+        (current, peak) = tracemalloc.get_traced_memory()
+        frame["memory"] = {"current_bytes": current, "peak_bytes": peak}
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+    _frames.append(frame)
+    _frame_number += 1
+    _current = _new_frame()
+    return frame
+
+def get_frame(index=-1):
+    """
+    return statistics of finished frame, by default the last one
+
+    dictionary with keys
+    frame    : frame number, counted from enable or reset
+    seconds  : time between begin_frame and end_frame
+    stages   : stage name to dictionary with seconds and calls
+    counters : counter name to value
+    memory   : only if memory is traced, current and peak bytes
+    """
+    return _frames[index]
+
+def get_frames():
+    """return list of statistics of all finished frames in history"""
+    return list(_frames)
+
+def get_totals():
+    """return sums of seconds, stages and counters over all frames in history"""
+    totals = {"frames": len(_frames), "seconds": 0.0, "stages": {}, "counters": {}}
+    for frame in _frames:
+        totals["seconds"] += frame["seconds"]
+        for (name, stage) in frame["stages"].items():
+            total = totals["stages"].setdefault(name, {"seconds": 0.0, "calls": 0})
+            total["seconds"] += stage["seconds"]
+            total["calls"] += stage["calls"]
+        for (name, value) in frame["counters"].items():
+            totals["counters"][name] = totals["counters"].get(name, 0) + value
+    return totals
+
+def dump_json(filename=None):
+    """
+    return totals and all frames in history as JSON string,
+    and write it to filename, if given
+    """
+    report = json.dumps({"totals": get_totals(), "frames": get_frames()}, indent=2, sort_keys=True)
+    if filename is not None:
+        with open(filename, "w") as outfile:
+            outfile.write(report + "\n")
+    return report
+
+reset()
@@ -0,0 +1,251 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import math
+# own modules
+from Matrix3D import Matrix3D as Matrix3D
+from Vector3D import Vector3D as Vector3D
+
+# below this difference quaternions are nearly equal, slerp falls back to nlerp
+SLERP_THRESHOLD = 0.9995
+
+class Quaternion(object):
+    """
+    unit quaternion w + xi + yj + zk, representing a rotation
+
+    rotation by angle θ around unit axis (ax, ay, az) is
+    (cos θ/2, ax sin θ/2, ay sin θ/2, az sin θ/2)
+
+    composition q1 * q2 is the rotation q2 followed by q1,
+    same order as Matrix3D.dot, but with 16 instead of 64 multiplications
+    every rotation has exactly 4 numbers, so normalizing now and then
+    removes any rounding drift, which is not so easy for 3 x 3 matrices
+    """
+
+    __slots__ = ("w", "x", "y", "z")
+
+    def __init__(self, w, x, y, z):
+        self.w = w
+        self.x = x
+        self.y = y
+        self.z = z
+
+    @classmethod
+    def identity(cls):
+        """no rotation"""
+        return cls(1.0, 0.0, 0.0, 0.0)
+
+    @classmethod
+    def from_axis_angle(cls, axis, theta):
+        """
+        rotation around axis, Vector3D or tuple (x, y, z),
+        with angle theta in radians, axis must not be of length 0
+        """
+        length = math.sqrt(axis[0] ** 2 + axis[1] ** 2 + axis[2] ** 2)
+        factor = math.sin(theta / 2.0) / length
+        return cls(math.cos(theta / 2.0), axis[0] * factor, axis[1] * factor, axis[2] * factor)
+
+    @classmethod
+    def from_rot_x(cls, theta):
+        """same rotation as Matrix3D.get_rot_x_matrix(theta)"""
+        return cls(math.cos(theta / 2.0), math.sin(theta / 2.0), 0.0, 0.0)
+
+    @classmethod
+    def from_rot_y(cls, theta):
+        """same rotation as Matrix3D.get_rot_y_matrix(theta)"""
+        return cls(math.cos(theta / 2.0), 0.0, math.sin(theta / 2.0), 0.0)
+
+    @classmethod
+    def from_rot_z(cls, theta):
+        """same rotation as Matrix3D.get_rot_z_matrix(theta)"""
+        return cls(math.cos(theta / 2.0), 0.0, 0.0, math.sin(theta / 2.0))
+
+    @classmethod
+    def from_euler(cls, x_angle, y_angle, z_angle):
+        """
+        same rotation as
+        get_rot_z_matrix(z_angle).dot(get_rot_x_matrix(x_angle).dot(get_rot_y_matrix(y_angle)))
+        so first around Y-Axis, then X-Axis, then Z-Axis
+        """
+        return cls.from_rot_z(z_angle) * cls.from_rot_x(x_angle) * cls.from_rot_y(y_angle)
+
+    @classmethod
+    def from_rot_align(cls, vector1, vector2):
+        """
+        shortest rotation turning direction of vector1 to direction of vector2,
+        like Matrix3D.get_rot_align, but vectors need not be unit vectors
+
+        the half way quaternion (|v1| |v2| + v1 . v2, v1 x v2), normalized,
+        needs no trigonometric functions at all
+        for opposite vectors any perpendicular axis is used
+        """
+        (x1, y1, z1) = (vector1[0], vector1[1], vector1[2])
+        (x2, y2, z2) = (vector2[0], vector2[1], vector2[2])
+        lengths = math.sqrt((x1 * x1 + y1 * y1 + z1 * z1) * (x2 * x2 + y2 * y2 + z2 * z2))
+        w = lengths + x1 * x2 + y1 * y2 + z1 * z2
+        if w < 1e-9 * lengths:
+            # opposite directions, rotate 180 degrees around perpendicular axis
+            if abs(x1) > abs(z1):
+                return cls.from_axis_angle((-y1, x1, 0.0), math.pi)
+            return cls.from_axis_angle((0.0, -z1, y1), math.pi)
+        return cls(w, y1 * z2 - z1 * y2, z1 * x2 - x1 * z2, x1 * y2 - y1 * x2).normalized()
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        """
+        rotation of upper 3 x 3 part of Matrix3D,
+        which has to be a pure rotation
+        """
+        ((m00, m01, m02), (m10, m11, m12), (m20, m21, m22)) = (matrix[0][:3], matrix[1][:3], matrix[2][:3])
+        trace = m00 + m11 + m22
+        # use biggest diagonal element to avoid division by small numbers
+        if trace > 0.0:
+            factor = 0.5 / math.sqrt(trace + 1.0)
+            quaternion = cls(0.25 / factor, (m21 - m12) * factor, (m02 - m20) * factor, (m10 - m01) * factor)
+        elif m00 > m11 and m00 > m22:
+            factor = 2.0 * math.sqrt(1.0 + m00 - m11 - m22)
+            quaternion = cls((m21 - m12) / factor, 0.25 * factor, (m01 + m10) / factor, (m02 + m20) / factor)
+        elif m11 > m22:
+            factor = 2.0 * math.sqrt(1.0 + m11 - m00 - m22)
+            quaternion = cls((m02 - m20) / factor, (m01 + m10) / factor, 0.25 * factor, (m12 + m21) / factor)
+        else:
+            factor = 2.0 * math.sqrt(1.0 + m22 - m00 - m11)
+            quaternion = cls((m10 - m01) / factor, (m02 + m20) / factor, (m12 + m21) / factor, 0.25 * factor)
+        return quaternion.normalized()
+
+    def to_matrix(self):
+        """return rotation as Matrix3D"""
+        (w, x, y, z) = (self.w, self.x, self.y, self.z)
+        (xx, yy, zz) = (2.0 * x * x, 2.0 * y * y, 2.0 * z * z)
+        (xy, xz, yz) = (2.0 * x * y, 2.0 * x * z, 2.0 * y * z)
+        (wx, wy, wz) = (2.0 * w * x, 2.0 * w * y, 2.0 * w * z)
+        return Matrix3D([
+            [1.0 - yy - zz, xy - wz      , xz + wy      , 0.0],
+            [xy + wz      , 1.0 - xx - zz, yz - wx      , 0.0],
+            [xz - wy      , yz + wx      , 1.0 - xx - yy, 0.0],
+            [0.0          , 0.0          , 0.0          , 1.0]
+        ])
+
+    def __eq__(self, other):
+        return self.w == other.w and self.x == other.x and self.y == other.y and self.z == other.z
+
+    def __ne__(self, other):
+        return not self == other
+
+    def nearly_equal(self, other):
+        """
+        test nearly equality of rotations,
+        q and -q are the same rotation
+        """
+        return abs(abs(self.dot(other)) - 1.0) < 0.0001
+
+    def __getitem__(self, key):
+        return (self.w, self.x, self.y, self.z)[key]
+
+    def __iter__(self):
+        return iter((self.w, self.x, self.y, self.z))
+
+    def __repr__(self):
+        return "Quaternion(%f, %f, %f, %f)" % (self.w, self.x, self.y, self.z)
+
+    def __mul__(self, other):
+        """
+        Hamilton product, rotation other followed by self
+        16 multiplications
+        """
+        (w1, x1, y1, z1) = (self.w, self.x, self.y, self.z)
+        (w2, x2, y2, z2) = (other.w, other.x, other.y, other.z)
+        return Quaternion(
+            w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+            w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+            w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+            w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2)
+
+    def __neg__(self):
+        """same rotation, other sign"""
+        return Quaternion(-self.w, -self.x, -self.y, -self.z)
+
+    def dot(self, other):
+        """4D dot product, cos of half the angle between two rotations"""
+        return self.w * other.w + self.x * other.x + self.y * other.y + self.z * other.z
+
+    def length(self):
+        return math.sqrt(self.w ** 2 + self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def normalized(self):
+        """return unit quaternion, removes drift of repeated compositions"""
+        factor = 1.0 / self.length()
+        return Quaternion(self.w * factor, self.x * factor, self.y * factor, self.z * factor)
+
+    def conjugate(self):
+        """inverse rotation, for unit quaternions"""
+        return Quaternion(self.w, -self.x, -self.y, -self.z)
+    inverse = conjugate
+
+    def get_axis_angle(self):
+        """return tuple (axis, angle), axis is a tuple (x, y, z)"""
+        w = max(-1.0, min(1.0, self.w))
+        factor = math.sqrt(1.0 - w * w)
+        if factor < 1e-12:
+            return ((1.0, 0.0, 0.0), 0.0)
+        return ((self.x / factor, self.y / factor, self.z / factor), 2.0 * math.acos(w))
+
+    def rotate(self, vector):
+        """
+        return rotated Vector3D, homogeneous part is kept
+
+        v' = v + w t + q x t, with t = 2 (q x v)
+        15 multiplications instead of two quaternion products
+        """
+        (w, x, y, z) = (self.w, self.x, self.y, self.z)
+        (v_x, v_y, v_z) = (vector[0], vector[1], vector[2])
+        t_x = 2.0 * (y * v_z - z * v_y)
+        t_y = 2.0 * (z * v_x - x * v_z)
+        t_z = 2.0 * (x * v_y - y * v_x)
+        return Vector3D(
+            v_x + w * t_x + y * t_z - z * t_y,
+            v_y + w * t_y + z * t_x - x * t_z,
+            v_z + w * t_z + x * t_y - y * t_x,
+            vector[3])
+
+    def rotate_many(self, vertices):
+        """
+        rotate many vertices, VertexArray or iterable of Vector3D objects,
+        the quaternion is converted to a matrix once, which needs
+        only 9 multiplications per vertex, see Matrix3D.transform_many
+        """
+        return self.to_matrix().transform_many(vertices)
+
+    def nlerp(self, other, t):
+        """
+        normalized linear interpolation, t from 0.0 (self) to 1.0 (other),
+        along the shorter way, cheap but not constant angular speed
+        """
+        if self.dot(other) < 0.0:
+            other = -other
+        return Quaternion(
+            self.w + (other.w - self.w) * t,
+            self.x + (other.x - self.x) * t,
+            self.y + (other.y - self.y) * t,
+            self.z + (other.z - self.z) * t).normalized()
+
+    def slerp(self, other, t):
+        """
+        spherical linear interpolation, t from 0.0 (self) to 1.0 (other),
+        along the shorter way with constant angular speed
+        """
+        dot = self.dot(other)
+        if dot < 0.0:
+            other = -other
+            dot = -dot
+        if dot > SLERP_THRESHOLD:
+            return self.nlerp(other, t)
+        theta = math.acos(dot)
+        sin_theta = math.sin(theta)
+        factor1 = math.sin((1.0 - t) * theta) / sin_theta
+        factor2 = math.sin(t * theta) / sin_theta
+        return Quaternion(
+            self.w * factor1 + other.w * factor2,
+            self.x * factor1 + other.x * factor2,
+            self.y * factor1 + other.y * factor2,
+            self.z * factor1 + other.z * factor2)
@@ -0,0 +1,212 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import sys
+import math
+from array import array
+# own modules
+import Models3D
+import Profiler3D
+from Matrix3D import Matrix3D as Matrix3D
+from Vector3D import Vector3D as Vector3D
+from Camera3D import Camera3D as Camera3D
+
+# minimum brightness of faces facing away from light
+AMBIENT = 0.2
+
+class FrameBuffer(object):
+    """
+    headless render target, no display needed
+
+    color is a bytearray of width * height RGB triples, row by row
+    depth is a array.array("d") of width * height inverse depth values,
+    bigger values are nearer, 0.0 means nothing drawn (infinitely far)
+    """
+
+    def __init__(self, width, height, background=(0, 0, 0)):
+        self.width = width
+        self.height = height
+        self.background = background
+        self.color = bytearray(3 * width * height)
+        self.depth = array("d", [0.0]) * (width * height)
+        self.clear()
+
+    def clear(self):
+        """fill color with background and reset depth"""
+        self.color[:] = bytearray(self.background) * (self.width * self.height)
+        self.depth[:] = array("d", [0.0]) * (self.width * self.height)
+
+    def get_pixel(self, x, y):
+        """return tuple (r, g, b) of pixel at x, y"""
+        index = 3 * (y * self.width + x)
+        return tuple(self.color[index:index + 3])
+
+    def to_ppm(self):
+        """return color buffer as binary PPM image"""
+        header = ("P6\n%d %d\n255\n" % (self.width, self.height)).encode("ascii")
+        return header + bytes(self.color)
+
+    def save_ppm(self, filename):
+        """write color buffer to file as binary PPM image"""
+        with open(filename, "wb") as outfile:
+            outfile.write(self.to_ppm())
+
+
+def draw_triangle(framebuffer, point0, point1, point2, color):
+    """
+    fill triangle with color, with depth test
+
+    points are tuples (x, y, inverse_depth) like returned by
+    Camera3D.project_many_depth, triangles with some point behind
+    the camera are skipped
+
+    all pixels of the bounding box of the triangle are visited,
+    the three edge functions and the inverse depth are linear in x and y,
+    so they are calculated once per box and then only incremented
+    per pixel and row, no objects are created in the inner loop
+
+    edge function of edge a -> b at point p
+    E(p) = (xb - xa) * (py - ya) - (yb - ya) * (px - xa)
+    p is inside if E >= 0 for all three edges
+
+    returns number of pixels drawn
+    """
+    (x0, y0, z0) = point0
+    (x1, y1, z1) = point1
+    (x2, y2, z2) = point2
+    if z0 <= 0.0 or z1 <= 0.0 or z2 <= 0.0:
+        return 0
+    area = (x1 - x0) * (y2 - y0) - (y1 - y0) * (x2 - x0)
+    if area == 0.0:
+        return 0
+    if area < 0.0:
+        # make triangle counter clockwise
+        (x1, y1, z1, x2, y2, z2) = (x2, y2, z2, x1, y1, z1)
+        area = -area
+    width = framebuffer.width
+    min_x = max(int(math.floor(min(x0, x1, x2))), 0)
+    max_x = min(int(math.ceil(max(x0, x1, x2))), width - 1)
+    min_y = max(int(math.floor(min(y0, y1, y2))), 0)
+    max_y = min(int(math.ceil(max(y0, y1, y2))), framebuffer.height - 1)
+    if min_x > max_x or min_y > max_y:
+        return 0
+    # sample at pixel centers
+    px = min_x + 0.5
+    py = min_y + 0.5
+    # e0 belongs to edge 1 -> 2, and is the weight of point0, and so on
+    e0_dx = y1 - y2
+    e0_dy = x2 - x1
+    e1_dx = y2 - y0
+    e1_dy = x0 - x2
+    e2_dx = y0 - y1
+    e2_dy = x1 - x0
+    e0_row = e0_dy * (py - y1) + e0_dx * (px - x1)
+    e1_row = e1_dy * (py - y2) + e1_dx * (px - x2)
+    e2_row = e2_dy * (py - y0) + e2_dx * (px - x0)
+    # interpolated inverse depth
+    inverse_area = 1.0 / area
+    z_dx = (e0_dx * z0 + e1_dx * z1 + e2_dx * z2) * inverse_area
+    z_dy = (e0_dy * z0 + e1_dy * z1 + e2_dy * z2) * inverse_area
+    z_row = (e0_row * z0 + e1_row * z1 + e2_row * z2) * inverse_area
+    (red, green, blue) = color
+    color_buffer = framebuffer.color
+    depth_buffer = framebuffer.depth
+    drawn = 0
+    span = range(min_x, max_x + 1)
+    for y in range(min_y, max_y + 1):
+        e0 = e0_row
+        e1 = e1_row
+        e2 = e2_row
+        z = z_row
+        index = y * width + min_x
+        for _ in span:
+            if e0 >= 0.0 and e1 >= 0.0 and e2 >= 0.0 and z > depth_buffer[index]:
+                depth_buffer[index] = z
+                color_index = 3 * index
+                color_buffer[color_index] = red
+                color_buffer[color_index + 1] = green
+                color_buffer[color_index + 2] = blue
+                drawn += 1
+            e0 += e0_dx
+            e1 += e1_dx
+            e2 += e2_dx
+            z += z_dx
+            index += 1
+        e0_row += e0_dy
+        e1_row += e1_dy
+        e2_row += e2_dy
+        z_row += z_dy
+    return drawn
+
+def draw_polygon(framebuffer, points, color):
+    """
+    fill convex polygon, given by list of projected points,
+    as fan of triangles, see draw_triangle
+    """
+    drawn = 0
+    for index in range(1, len(points) - 1):
+        drawn += draw_triangle(framebuffer, points[0], points[index], points[index + 1], color)
+    return drawn
+
+def _shade(color, normal, light):
+    """scale color by angle between face normal and light direction"""
+    length = math.sqrt(normal[0] ** 2 + normal[1] ** 2 + normal[2] ** 2)
+    if length == 0.0:
+        return color
+    factor = (normal[0] * light[0] + normal[1] * light[1] + normal[2] * light[2]) / length
+    factor = max(factor, AMBIENT)
+    return tuple((int(value * factor) for value in color))
+
+def render_mesh(framebuffer, mesh, camera, color=(255, 255, 255), light=None, cull=True):
+    """
+    render Mesh3D to framebuffer
+
+    every unique vertex is projected only once, faces are culled
+    with Mesh3D.cull first, if cull is True
+    light is a optional normalized Vector3D pointing to the light,
+    to shade every face by its normal
+    returns number of pixels drawn
+    """
+    if cull:
+        face_indices = mesh.cull(camera)
+    else:
+        face_indices = range(len(mesh))
+    if light is not None:
+        normals = mesh.get_face_normals()
+    projected = camera.project_many_depth(mesh.vertices)
+    drawn = 0
+    with Profiler3D.stage("draw"):
+        for face_index in face_indices:
+            face_color = color
+            if light is not None:
+                face_color = _shade(color, normals[face_index], light)
+            points = [projected[index] for index in mesh.get_face_indices(face_index)]
+            drawn += draw_polygon(framebuffer, points, face_color)
+    Profiler3D.count("pixels_drawn", drawn)
+    return drawn
+
+def render_faces(framebuffer, faces, camera, color=(255, 255, 255)):
+    """
+    render iterable of Face3D objects to framebuffer
+    returns number of pixels drawn
+    """
+    drawn = 0
+    for face in faces:
+        points = camera.project_many_depth(face.vertices)
+        with Profiler3D.stage("draw"):
+            drawn += draw_polygon(framebuffer, points, color)
+    Profiler3D.count("pixels_drawn", drawn)
+    return drawn
+
+
+if __name__ == "__main__":
+    # render one frame of a rotated cube without any display
+    filename = sys.argv[1] if len(sys.argv) > 1 else "cube.ppm"
+    framebuffer = FrameBuffer(320, 180)
+    camera = Camera3D((0, 0), viewport=(160.0, 90.0))
+    mesh = Models3D.get_cube_mesh()
+    mesh = mesh.transform(Matrix3D.get_rot_y_matrix(0.5).dot(Matrix3D.get_rot_x_matrix(0.4)))
+    mesh = mesh.transform(Matrix3D.get_shift_matrix(0, 0, 16))
+    light = Vector3D(0.0, 0.0, -1.0, 1.0)
+    render_mesh(framebuffer, mesh, camera, light=light)
+    framebuffer.save_ppm(filename)
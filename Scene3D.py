@@ -0,0 +1,147 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# own modules
+from Matrix3D import Matrix3D as Matrix3D
+
+class Node3D(object):
+    """
+    node of scene graph, with local transformation Matrix3D,
+    optional Mesh3D and any number of child nodes
+
+    world matrix of node is world matrix of parent DOT local matrix,
+    it is cached and recalculated only, if the local matrix of the
+    node or of some ancestor changed since the last call
+
+    if a node is dirty, all of its descendants are dirty too,
+    so marking a node stops at already dirty children and
+    nodes which never change cost nothing at all
+    """
+
+    def __init__(self, matrix=None, mesh=None, name=None):
+        """
+        matrix is the local transformation, defaults to identity
+        mesh is a optional Mesh3D in local coordinates
+        """
+        self.name = name
+        self.mesh = mesh
+        self.parent = None
+        self.children = []
+        self.__matrix = matrix if matrix is not None else Matrix3D.identity()
+        self.__world_matrix = None
+        self.__world_mesh = None
+        self.__dirty = True
+
+    def __repr__(self):
+        return "Node3D(name=%r, children=%d)" % (self.name, len(self.children))
+
+    @property
+    def matrix(self):
+        """local transformation, assign a new Matrix3D to change it"""
+        return self.__matrix
+
+    @matrix.setter
+    def matrix(self, matrix):
+        self.__matrix = matrix
+        self.set_dirty()
+
+    def set_dirty(self):
+        """
+        mark world matrix of self and all descendants as outdated,
+        call this after changing the local matrix in place
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.__dirty:
+                # whole subtree is dirty already
+                continue
+            node.__dirty = True
+            stack.extend(node.children)
+
+    def is_dirty(self):
+        return self.__dirty
+
+    def add(self, child):
+        """add child node, detached from former parent, returns child"""
+        if child.parent is not None:
+            child.parent.remove(child)
+        child.parent = self
+        self.children.append(child)
+        child.set_dirty()
+        return child
+
+    def remove(self, child):
+        """remove child node, its subtree becomes a tree of its own"""
+        self.children.remove(child)
+        child.parent = None
+        child.set_dirty()
+
+    def get_world_matrix(self):
+        """return transformation from local to world coordinates"""
+        if self.__dirty:
+            if self.parent is None:
+                self.__world_matrix = self.__matrix
+            else:
+                self.__world_matrix = self.parent.get_world_matrix().dot(self.__matrix)
+            self.__world_mesh = None
+            self.__dirty = False
+        return self.__world_matrix
+
+    def get_world_mesh(self):
+        """
+        return mesh transformed to world coordinates, or None
+
+        the transformed mesh is cached like the world matrix,
+        so vertices of static nodes are transformed only once,
+        changes of mesh by Mesh3D.set_vertex are detected too
+        """
+        if self.mesh is None:
+            return None
+        world_matrix = self.get_world_matrix()
+        key = (self.mesh, self.mesh.get_version())
+        if self.__world_mesh is None or self.__world_mesh[0] != key:
+            self.__world_mesh = (key, self.mesh.transform(world_matrix))
+        return self.__world_mesh[1]
+
+    def walk(self):
+        """iterate over self and all descendants, depth first, parents first"""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+
+class Scene3D(object):
+    """
+    scene graph, all nodes are descendants of root,
+    root could be transformed like any other node
+    """
+
+    def __init__(self):
+        self.root = Node3D(name="root")
+
+    def add(self, node):
+        """add node as child of root, returns node"""
+        return self.root.add(node)
+
+    def walk(self):
+        """iterate over all nodes, see Node3D.walk"""
+        return self.root.walk()
+
+    def get_world_meshes(self):
+        """return list of tuples (node, mesh in world coordinates) of all nodes with mesh"""
+        return [(node, node.get_world_mesh()) for node in self.walk() if node.mesh is not None]
+
+    def cull(self, camera):
+        """
+        return list of tuples (node, mesh, visible face indices),
+        nodes without visible faces are left out, see Mesh3D.cull
+        """
+        visible = []
+        for (node, mesh) in self.get_world_meshes():
+            face_indices = mesh.cull(camera)
+            if face_indices:
+                visible.append((node, mesh, face_indices))
+        return visible
@@ -5,6 +5,40 @@ import math
 import unittest
 from Vector3D import Vector3D as Vector3D
 from Matrix3D import Matrix3D as Matrix3D
+from VertexArray import VertexArray as VertexArray
+from Face3D import Face3D as Face3D
+from Mesh3D import Mesh3D as Mesh3D
+from Camera3D import Camera3D as Camera3D
+from Bounds3D import BoundingBox3D as BoundingBox3D
+from Bounds3D import BoundingSphere3D as BoundingSphere3D
+from DepthSort3D import DepthSort3D as DepthSort3D
+from BVH3D import BVH3D as BVH3D
+import Loaders3D
+import MeshCache3D
+import Models3D
+import os
+import struct
+import shutil
+import tempfile
+import random
+import json
+import pickle
+import Rasterizer3D
+import Animation3D
+import Profiler3D
+import Kernels3D
+import Backend3D
+from Quaternion import Quaternion as Quaternion
+from Scene3D import Node3D as Node3D
+from Scene3D import Scene3D as Scene3D
+import frame_benchmark
+from Parallel3D import ParallelTransformer as ParallelTransformer
+
+
+class Point3D(Vector3D):
+    """subclass of Vector3D, pickle has to keep the class"""
+    __slots__ = ()
+
 
 class TestClass(unittest.TestCase):
 
@@ -187,6 +221,731 @@ class TestClass(unittest.TestCase):
         test_v = Vector3D.from_list([0.000000, 1.000000, 0.000000, 1.000000])
         assert real_v.nearly_equal(test_v)
 
+    def test_vector(self):
+        vector = Vector3D(1.0, 2.0, 3.0, 1.0)
+        assert not hasattr(vector, "__dict__")
+        # index access and attributes are the same state
+        vector[0] = 4.0
+        assert vector.x == 4.0
+        vector.y = 5.0
+        assert vector[1] == 5.0
+        assert vector[-1] == 1.0
+        assert vector[:3] == (4.0, 5.0, 3.0)
+        assert tuple(vector) == (4.0, 5.0, 3.0, 1.0)
+        assert eval(repr(vector)) == vector
+        # inplace operators keep identity
+        same = vector
+        vector += Vector3D(1.0, 1.0, 1.0, 1.0)
+        vector -= Vector3D(0.0, 0.0, 1.0, 1.0)
+        vector *= 2.0
+        vector /= 4.0
+        assert vector is same
+        assert vector == Vector3D(2.5, 3.0, 1.5, 1.0)
+        assert Vector3D(1.0, 2.0, 4.0, 1.0) / 2 == Vector3D(0.5, 1.0, 2.0, 1.0)
+        # allocation free variants
+        out = Vector3D(0.0, 0.0, 0.0, 1.0)
+        vector1 = Vector3D(1.0, 0.0, 0.0, 1.0)
+        vector2 = Vector3D(0.0, 1.0, 0.0, 1.0)
+        assert Vector3D.add_into(out, vector1, vector2) is out
+        assert out == vector1 + vector2
+        assert Vector3D.sub_into(out, vector1, vector2) == vector1 - vector2
+        assert Vector3D.mul_into(out, vector1, 3.0) == vector1 * 3.0
+        assert Vector3D.cross_into(out, vector1, vector2) == vector1.cross(vector2)
+        assert Vector3D.cross_into(vector1, vector1, vector2) == Vector3D(0.0, 0.0, 1.0, 1.0)
+        assert pickle.loads(pickle.dumps(vector)) == vector
+        point = pickle.loads(pickle.dumps(Point3D(1, 2, 3)))
+        assert type(point) is Point3D
+        assert tuple(point) == (1, 2, 3, 1)
+
+    def test_quaternion(self):
+        vector = Vector3D(1.0, -2.0, 3.0, 1.0)
+        for theta in (0.0, 0.3, -1.2, math.pi):
+            for (quaternion, matrix) in (
+                    (Quaternion.from_rot_x(theta), Matrix3D.get_rot_x_matrix(theta)),
+                    (Quaternion.from_rot_y(theta), Matrix3D.get_rot_y_matrix(theta)),
+                    (Quaternion.from_rot_z(theta), Matrix3D.get_rot_z_matrix(theta))):
+                assert quaternion.rotate(vector).nearly_equal(matrix.v_dot(vector))
+                assert quaternion.to_matrix().v_dot(vector).nearly_equal(matrix.v_dot(vector))
+                assert Quaternion.from_matrix(matrix).nearly_equal(quaternion)
+        # composition in same order as Matrix3D.dot
+        (x_angle, y_angle, z_angle) = (0.4, -0.7, 1.1)
+        matrix = Matrix3D.get_rot_z_matrix(z_angle).dot(Matrix3D.get_rot_x_matrix(x_angle).dot(Matrix3D.get_rot_y_matrix(y_angle)))
+        quaternion = Quaternion.from_euler(x_angle, y_angle, z_angle)
+        assert quaternion.rotate(vector).nearly_equal(matrix.v_dot(vector))
+        assert Quaternion.from_matrix(matrix).nearly_equal(quaternion)
+        assert (quaternion * quaternion.conjugate()).nearly_equal(Quaternion.identity())
+        rotated = quaternion.rotate_many(VertexArray.from_vectors([vector, vector]))
+        assert rotated[1].nearly_equal(matrix.v_dot(vector))
+        # align
+        for target in (Vector3D(0.0, 0.0, 2.0, 1.0), Vector3D(-1.0, 2.0, -3.0, 1.0), vector * -1.0):
+            rotated = Quaternion.from_rot_align(vector, target).rotate(vector)
+            assert rotated.nearly_equal(target * (vector.length() / target.length()))
+        # interpolation
+        start = Quaternion.from_rot_y(0.2)
+        stop = Quaternion.from_rot_y(1.0)
+        assert start.slerp(stop, 0.0).nearly_equal(start)
+        assert start.slerp(stop, 1.0).nearly_equal(stop)
+        assert start.slerp(stop, 0.25).nearly_equal(Quaternion.from_rot_y(0.4))
+        assert start.nlerp(-stop, 0.5).nearly_equal(Quaternion.from_rot_y(0.6))
+        # precalculated rotations
+        matrices = Models3D.get_rot_matrix(Matrix3D.get_shift_matrix(0, 0, 5), (1, 2, 3), 10)
+        expected = Matrix3D.get_shift_matrix(0, 0, 5).dot(Matrix3D.get_rot_z_matrix(27 * math.pi / 180).dot(
+            Matrix3D.get_rot_x_matrix(9 * math.pi / 180).dot(Matrix3D.get_rot_y_matrix(18 * math.pi / 180))))
+        assert matrices[9].v_dot(vector).nearly_equal(expected.v_dot(vector))
+
+    def test_compose(self):
+        random.seed(3)
+        def random_matrix(affine):
+            data = [[random.uniform(-2.0, 2.0) for _ in range(4)] for _ in range(4)]
+            if affine:
+                data[3] = [0, 0, 0, 1]
+            return Matrix3D(data)
+        def nearly_equal(matrix1, matrix2):
+            return all((abs(matrix1[row][col] - matrix2[row][col]) < 0.0001 for row in range(4) for col in range(4)))
+        affine1 = random_matrix(True)
+        affine2 = random_matrix(True)
+        full1 = random_matrix(False)
+        full2 = random_matrix(False)
+        assert affine1.is_affine() and not full1.is_affine()
+        # unrolled kernels against definition
+        for (matrix1, matrix2) in ((affine1, affine2), (affine1, full1), (full1, full2)):
+            product = matrix1.dot(matrix2)
+            for row in range(4):
+                for col in range(4):
+                    assert abs(product[row][col] - sum((matrix1[row][k] * matrix2[k][col] for k in range(4)))) < 0.0001
+        assert affine1.dot(affine2).is_affine()
+        chain = (full1, affine1, affine2, full2, affine2, affine1)
+        expected = chain[0]
+        for matrix in chain[1:]:
+            expected = expected.dot(matrix)
+        assert nearly_equal(Matrix3D.compose(*chain), expected)
+        assert Matrix3D.compose() == Matrix3D.identity()
+        single = Matrix3D.compose(affine1)
+        assert single == affine1
+        single[0, 0] = 5.0
+        assert affine1[0][0] != 5.0
+        products = Matrix3D.dot_pairwise([affine1, full1], [full2, affine2])
+        assert products == [affine1.dot(full2), full1.dot(affine2)]
+        assert Matrix3D.dot_pairwise(full1, [affine1, affine2]) == [full1.dot(affine1), full1.dot(affine2)]
+
+    def test_kernels(self):
+        vertices = VertexArray.from_vectors([Vector3D(1.0, -2.0, 3.0, 1.0), Vector3D(-0.5, 4.0, 2.0, 0.0)])
+        matrices = {
+            "translation": Matrix3D.get_shift_matrix(1.0, 2.0, 3.0),
+            "scale": Matrix3D.get_scale_matrix(2.0, 3.0, 4.0),
+            "linear": Matrix3D.get_rot_y_matrix(0.3),
+            "affine": Matrix3D.get_shift_matrix(1.0, 2.0, 3.0).dot(Matrix3D.get_rot_x_matrix(0.3)),
+            "projective": Camera3D((0, 0)).get_matrix(),
+        }
+        for (kind, matrix) in matrices.items():
+            assert matrix.get_kind() == kind
+            # every specialised kernel gives the same result as the general one
+            expected = Kernels3D.TRANSFORM_INTO["projective"](matrix, vertices.data, vertices.copy().data, 0, len(vertices))
+            assert matrix.transform_into(vertices.data, vertices.copy().data) == expected
+            for vertice in vertices:
+                assert list(matrix.v_dot(vertice)) == [sum((matrix[row][col] * vertice[col] for col in range(4))) for row in range(4)]
+            assert matrix.transpose().transpose() == matrix
+            assert all((matrix.transpose()[row][col] == matrix[col][row] for row in range(4) for col in range(4)))
+            assert matrix.scale(2.0)[1][2] == matrix[1][2] * 2.0
+        assert "for index in range" in Kernels3D.SOURCES["transform_into_translation"]
+
+    def test_transform_many(self):
+        """batched transformations must match v_dot"""
+        m = Matrix3D.get_shift_matrix(1, 2, 3).dot(Matrix3D.get_rot_z_matrix(0.5))
+        vertices = [Vector3D(1, 0, 0, 1), Vector3D(0, 1, 2, 1), Vector3D(-3, 4, 5, 1)]
+        for real_v, vertice in zip(m.transform_many(vertices), vertices):
+            assert real_v.nearly_equal(m.v_dot(vertice))
+        src = []
+        for vertice in vertices:
+            src.extend(vertice)
+        dst = [0.0] * len(src)
+        m.transform_into(src, dst)
+        for index, vertice in enumerate(vertices):
+            assert Vector3D.from_list(dst[index * 4:]).nearly_equal(m.v_dot(vertice))
+        # inplace and partial
+        m.transform_into(src, src, start=1, stop=2)
+        assert src[:4] == list(vertices[0])
+        assert src[4:8] == dst[4:8]
+        assert src[8:] == list(vertices[2])
+
+    def test_vertex_array(self):
+        vertices = [Vector3D(1, 0, 0, 1), Vector3D(0, 1, 2, 1), Vector3D(-3, 4, 5, 1)]
+        va = VertexArray.from_vectors(vertices)
+        assert len(va) == 3
+        assert len(va.data) == 12
+        assert va[1] == vertices[1]
+        assert va[-1] == vertices[2]
+        assert list(va) == vertices
+        assert va[1:] == VertexArray.from_vectors(vertices[1:])
+        va[0] = Vector3D(7, 8, 9, 1)
+        assert va[0] == Vector3D(7, 8, 9, 1)
+        assert eval(repr(va)) == va
+        # Matrix3D consumes VertexArray directly
+        m = Matrix3D.get_rot_x_matrix(0.3)
+        transformed = m.transform_many(va)
+        assert isinstance(transformed, VertexArray)
+        for real_v, vertice in zip(transformed, va):
+            assert real_v.nearly_equal(m.v_dot(vertice))
+        # Face3D stores VertexArray
+        face = Face3D(vertices)
+        assert isinstance(face.vertices, VertexArray)
+        assert face[2] == vertices[2]
+        assert face.transform(m).vertices.nearly_equal(m.transform_many(vertices))
+
+    def test_mesh_indexed(self):
+        mesh = Models3D.get_cube_mesh()
+        assert len(mesh) == 6
+        assert len(mesh.vertices) == 8
+        assert list(mesh.get_face_indices(1)) == [1, 2, 6, 5]
+        # normals point outwards
+        for face, axis in zip(mesh, (0, 0, 1, 1, 2, 2)):
+            center = sum((vertice[axis] for vertice in face)) / 4.0
+            assert face.normal[axis] * center > 0
+        # only unique vertices are transformed, index buffers are shared
+        m = Matrix3D.get_shift_matrix(1, 2, 3)
+        moved = mesh.transform(m)
+        assert len(moved.vertices) == 8
+        assert moved.indices is mesh.indices
+        for face, moved_face in zip(mesh, moved):
+            assert moved_face.vertices.nearly_equal(face.transform(m).vertices)
+        # faces given as Face3D objects are welded together
+        rec = Face3D(Models3D.get_rectangle_points())
+        faces = [
+            rec.transform(Matrix3D.get_shift_matrix(-1, 0, 0).dot(Matrix3D.get_rot_y_matrix(math.pi/2))),
+            rec.transform(Matrix3D.get_shift_matrix(0, 0, -1)),
+        ]
+        welded = Mesh3D(faces)
+        assert len(welded.vertices) == 6
+        assert welded[0].vertices.nearly_equal(faces[0].vertices)
+
+    def test_lazy_transform(self):
+        rot = Matrix3D.get_rot_z_matrix(0.7)
+        scale = Matrix3D.get_scale_matrix(2, 2, 2)
+        shift = Matrix3D.get_shift_matrix(0, 0, 10)
+        mesh = Models3D.get_cube_mesh()
+        lazy = mesh.transform(rot).transform(scale).transform(shift)
+        # nothing transformed until read, one combined matrix is pending
+        assert lazy.get_pending_matrix() == shift.dot(scale.dot(rot))
+        assert mesh.get_pending_matrix() is None
+        expected = shift.transform_many(scale.transform_many(rot.transform_many(mesh.vertices)))
+        assert lazy.vertices.nearly_equal(expected)
+        assert lazy.get_pending_matrix() is None
+        for face, lazy_face in zip(mesh, lazy):
+            assert lazy_face.vertices.nearly_equal(shift.transform_many(scale.transform_many(rot.transform_many(face.vertices))))
+        # same for single faces
+        face = mesh[0]
+        lazy_face = face.transform(rot).transform(shift)
+        assert lazy_face.get_pending_matrix() is not None
+        eager_face = Face3D(shift.transform_many(rot.transform_many(face.vertices)))
+        assert Vector3D.from_list(lazy_face.normal).nearly_equal(Vector3D.from_list(eager_face.normal))
+        # normal is derived from normal of base vertices, no vertex is transformed
+        assert lazy_face.get_pending_matrix() is not None
+        assert lazy_face.vertices.nearly_equal(eager_face.vertices)
+        assert lazy_face.get_pending_matrix() is None
+
+    def test_face_normals(self):
+        face = Models3D.get_cube_mesh()[2]
+        skew = Matrix3D([[1.0, 0.5, 0.0, 1.0], [0.0, 2.0, 0.3, -2.0], [0.2, 0.0, -1.5, 3.0], [0.0, 0.0, 0.0, 1.0]])
+        projection = Camera3D((0, 0)).get_matrix()
+        for matrix in (skew, projection, Matrix3D.get_scale_matrix(0.0, 1.0, 1.0)):
+            expected = Face3D(matrix.transform_many(face.vertices)).normal
+            # normal of base face not yet known, or passed on
+            for base in (Face3D(face.vertices), face):
+                normal = base.transform(matrix).normal
+                assert all((abs(normal[axis] - expected[axis]) < 1e-9 for axis in range(4)))
+        normal_matrix = skew.get_normal_matrix()
+        # cofactor matrix calculated once for many faces, and for chained transformations
+        for cube_face in Models3D.get_cube_mesh().faces:
+            expected = Face3D(skew.transform_many(cube_face.vertices)).normal
+            for transformed in (cube_face.transform(skew, normal_matrix), cube_face.transform(Matrix3D.get_rot_z_matrix(0.5)).transform(skew.dot(Matrix3D.get_rot_z_matrix(-0.5)))):
+                normal = transformed.normal
+                assert all((abs(normal[axis] - expected[axis]) < 1e-9 for axis in range(4)))
+        # cofactor matrix is inverse transpose times determinant
+        inverse = skew.inverse()
+        assert all((abs(normal_matrix[row][col] - inverse[col][row] * skew.det()) < 1e-9 for row in range(3) for col in range(3)))
+        skew[0, 1] = 0.0
+        assert skew.get_normal_matrix()[2][2] == 2.0
+        # changes of rows are seen too
+        scale = Matrix3D.get_scale_matrix(2, 2, 2)
+        assert scale.get_normal_matrix()[0] == (4, 0, 0)
+        scale[0][0] = 5.0
+        assert scale.get_normal_matrix()[1] == (0, 10.0, 0)
+        # different homogeneous parts, normal of transformed vertices
+        vertices = [Vector3D(0, 0, 0, 1), Vector3D(1, 0, 0, 2), Vector3D(0, 1, 0, 1)]
+        assert Face3D(vertices).transform(skew).normal == Face3D(skew.transform_many(vertices)).normal
+        face.set_vertex(0, face[0] * 2)
+        assert face.normal == Face3D(face.vertices).normal
+        # passed on normal stays valid, if base face changes later
+        face = Face3D([Vector3D(0, 0, 0), Vector3D(1, 0, 0), Vector3D(0, 1, 0)])
+        assert face.normal == (0, 0, 1, 1.0)
+        lazy = face.transform(Matrix3D.get_shift_matrix(1, 2, 3))
+        face.set_vertex(2, Vector3D(0, 0, 1))
+        assert face.normal == (0, -1, 0, 1.0)
+        assert lazy.normal == (0, 0, 1, 1.0)
+        assert lazy.normal == Face3D(lazy.vertices).normal
+
+    def test_camera(self):
+        fov = 1.0 / math.tan(50 * math.pi / 180)
+        center = (300, 300)
+        camera = Camera3D(center, fov=fov, near=1.0, far=100.0, x_angle=0.1, y_angle=0.2)
+        clipping_m = Matrix3D([
+            [fov * 16.0 / 9.0, 0.0, 0.0, 0.0],
+            [0.0, fov, 0.0, 0.0],
+            [0.0, 0.0, 101.0 / 99.0, 200.0 / -99.0],
+            [0.0, 0.0, 1.0, 0.0]
+        ])
+        cam_rot_m = Matrix3D.get_rot_y_matrix(0.2).dot(Matrix3D.get_rot_x_matrix(0.1))
+        full_m = clipping_m.dot(Matrix3D.get_shift_matrix(0, 0, -10).dot(cam_rot_m))
+        vertices = [Vector3D(1, 2, 30, 1), Vector3D(-1, 0.5, 20, 1)]
+        projected = camera.project_many(VertexArray.from_vectors(vertices))
+        assert projected == camera.project_many(vertices)
+        for (x, y), vertice in zip(projected, vertices):
+            new_vector = full_m.v_dot(vertice)
+            assert abs(x - (center[0] + new_vector.x * 16.0 / (2.0 * new_vector.z) + 8.0)) < 0.0001
+            assert abs(y - (center[1] + new_vector.y * 9.0 / (2.0 * new_vector.z) + 4.5)) < 0.0001
+        # matrix is cached until some parameter changes
+        matrix = camera.get_matrix()
+        camera.x_angle = 0.1
+        assert camera.get_matrix() is matrix
+        camera.x_angle = 0.2
+        assert camera.get_matrix() is not matrix
+
+    def test_culling(self):
+        camera = Camera3D((300, 300))
+        assert camera.get_eye().nearly_equal(Vector3D(0, 0, 10, 1))
+        mesh = Models3D.get_cube_mesh().transform(Matrix3D.get_shift_matrix(0, 0, 30))
+        # only front face looks to camera
+        assert mesh.cull_backfaces(camera.get_eye()) == [4]
+        assert mesh.cull_frustum(camera) == list(range(6))
+        assert mesh.cull(camera) == [4]
+        assert len(mesh.get_visible_faces(camera)) == 1
+        # rotated cube shows three faces
+        rotated = Models3D.get_cube_mesh().transform(Matrix3D.get_rot_x_matrix(0.3)).transform(Matrix3D.get_rot_y_matrix(0.3))
+        assert len(rotated.transform(Matrix3D.get_shift_matrix(0, 0, 30)).cull(camera)) == 3
+        # behind the camera or far beside it
+        assert mesh.transform(Matrix3D.get_shift_matrix(0, 0, -40)).cull_frustum(camera) == []
+        assert mesh.transform(Matrix3D.get_shift_matrix(1000, 0, 0)).cull(camera) == []
+        # empty mesh
+        assert Mesh3D([]).cull(camera) == []
+        assert Mesh3D.from_face_indices(VertexArray(), []).transform(Matrix3D.get_shift_matrix(0, 0, 30)).cull(camera) == []
+
+    def test_bounds(self):
+        mesh = Models3D.get_cube_mesh()
+        box = mesh.get_bounding_box()
+        assert box.minimum == (-1, -1, -1)
+        assert box.maximum == (1, 1, 1)
+        assert mesh.get_bounding_box() is box
+        sphere = mesh.get_bounding_sphere()
+        assert abs(sphere.radius - math.sqrt(3)) < 0.0001
+        # transformed bounds do not need the vertices
+        m = Matrix3D.get_shift_matrix(5, 0, 0).dot(Matrix3D.get_scale_matrix(2, 2, 2))
+        moved = mesh.transform(m)
+        assert moved.get_bounding_box() == BoundingBox3D((3, -2, -2), (7, 2, 2))
+        sphere = moved.get_bounding_sphere()
+        assert sphere.center.nearly_equal(Vector3D(5, 0, 0, 1))
+        assert abs(sphere.radius - 2 * math.sqrt(3)) < 0.0001
+        assert moved.get_pending_matrix() is not None
+        assert box.contains(Vector3D(0, 0.5, 0, 1))
+        assert not box.contains(Vector3D(0, 1.5, 0, 1))
+        assert not box.intersects(moved.get_bounding_box())
+        # mutation invalidates
+        unresolved = mesh.transform(m)
+        mesh.set_vertex(6, Vector3D(3, 3, 3, 1))
+        assert mesh.get_bounding_box().maximum == (3, 3, 3)
+        # transformed meshes keep vertices and bounds at time of transform
+        assert moved.vertices[6].nearly_equal(Vector3D(7, 2, 2, 1))
+        assert moved.get_bounding_box() == BoundingBox3D.from_vertices(moved.vertices)
+        assert unresolved.get_bounding_box() == BoundingBox3D((3, -2, -2), (7, 2, 2))
+        assert unresolved.get_bounding_box() == BoundingBox3D.from_vertices(unresolved.vertices)
+        assert mesh.transform(m).get_bounding_box() == BoundingBox3D((3, -2, -2), (11, 6, 6))
+        # faces
+        face = mesh[1]
+        assert face.get_bounding_box() == BoundingBox3D((1, -1, -1), (3, 3, 3))
+        assert face.transform(m).get_bounding_box() == BoundingBox3D((7, -2, -2), (11, 6, 6))
+        moved_face = face.transform(m)
+        face.set_vertex(2, Vector3D(1, 1, 1, 1))
+        assert face.get_bounding_box().maximum == (1, 1, 1)
+        assert moved_face.get_bounding_box() == BoundingBox3D((7, -2, -2), (11, 6, 6))
+        assert moved_face.get_bounding_box() == BoundingBox3D.from_vertices(moved_face.vertices)
+
+    def test_rasterizer(self):
+        framebuffer = Rasterizer3D.FrameBuffer(20, 10)
+        # far triangle first, near triangle second, and the other way round
+        far = ((0.0, 0.0, 0.1), (20.0, 0.0, 0.1), (0.0, 10.0, 0.1))
+        near = ((0.0, 0.0, 0.5), (0.0, 10.0, 0.5), (20.0, 10.0, 0.5))
+        assert Rasterizer3D.draw_triangle(framebuffer, far[0], far[1], far[2], (255, 0, 0)) > 0
+        assert Rasterizer3D.draw_triangle(framebuffer, near[0], near[1], near[2], (0, 255, 0)) > 0
+        assert framebuffer.get_pixel(1, 8) == (0, 255, 0)
+        assert framebuffer.get_pixel(18, 1) == (0, 0, 0)
+        assert framebuffer.get_pixel(10, 1) == (255, 0, 0)
+        image = framebuffer.to_ppm()
+        framebuffer.clear()
+        Rasterizer3D.draw_triangle(framebuffer, near[0], near[1], near[2], (0, 255, 0))
+        assert Rasterizer3D.draw_triangle(framebuffer, far[0], far[1], far[2], (255, 0, 0)) > 0
+        assert framebuffer.to_ppm() == image
+        # culled and unculled cube give the same image
+        camera = Camera3D((0, 0), viewport=(10.0, 5.0))
+        mesh = Models3D.get_cube_mesh().transform(Matrix3D.get_rot_y_matrix(0.5)).transform(Matrix3D.get_shift_matrix(0, 0, 16))
+        framebuffer.clear()
+        assert Rasterizer3D.render_mesh(framebuffer, mesh, camera, cull=True) > 0
+        image = framebuffer.to_ppm()
+        framebuffer.clear()
+        Rasterizer3D.render_mesh(framebuffer, mesh, camera, cull=False)
+        assert framebuffer.to_ppm() == image
+
+    def test_depth_sort(self):
+        mesh = Models3D.get_cube_mesh()
+        assert mesh[3].get_avg_z() == 0
+        assert mesh[5].get_avg_z() == 1
+        keys = mesh.get_depth_keys()
+        assert keys == [face.get_avg_z() for face in mesh]
+        # back face first, front face last
+        order = mesh.sort_faces()
+        assert order[0] == 5
+        assert order[-1] == 4
+        # depth along view direction
+        view_m = Matrix3D.get_rot_y_matrix(math.pi / 2)
+        view_keys = mesh.get_depth_keys(view_m)
+        for key, face in zip(view_keys, mesh.transform(view_m)):
+            assert abs(key - face.get_avg_z()) < 0.0001
+        # frame coherent sorting gives same result as full sort
+        sorter = DepthSort3D()
+        for step in range(10):
+            moved = mesh.transform(Matrix3D.get_rot_y_matrix(step * 0.2))
+            keys = moved.get_depth_keys()
+            order = sorter.sort(keys)
+            assert [keys[index] for index in order] == sorted(keys, reverse=True)
+        assert sorter.sort_mesh(moved, face_indices=[4, 0]) == [index for index in moved.sort_faces() if index in (0, 4)]
+
+    def test_bvh(self):
+        # random triangles, compare with brute force
+        rand = random.Random(42)
+        vertices = [Vector3D(rand.uniform(-10, 10), rand.uniform(-10, 10), rand.uniform(-10, 10), 1) for _ in range(300)]
+        mesh = Mesh3D.from_face_indices(vertices, [(3 * index, 3 * index + 1, 3 * index + 2) for index in range(100)])
+        bvh = BVH3D(mesh)
+        brute = BVH3D(mesh, leaf_size=1000)
+        assert len(brute) == 1
+        assert len(bvh) > 1
+        hits = 0
+        for _ in range(200):
+            origin = (rand.uniform(-20, 20), rand.uniform(-20, 20), -30.0)
+            direction = (rand.uniform(-0.5, 0.5), rand.uniform(-0.5, 0.5), 1.0)
+            hit = bvh.intersect(origin, direction)
+            assert hit == brute.intersect(origin, direction)
+            if hit is not None:
+                hits += 1
+                (face_index, triangle, t, u, v) = hit
+                (index0, index1, index2) = bvh.get_triangle_indices(triangle)
+                for axis in range(3):
+                    point = (1 - u - v) * vertices[index0][axis] + u * vertices[index1][axis] + v * vertices[index2][axis]
+                    assert abs(point - (origin[axis] + t * direction[axis])) < 0.0001
+        assert hits > 0
+        # picking on screen
+        camera = Camera3D((0, 0), viewport=(10.0, 5.0))
+        cube = Models3D.get_cube_mesh().transform(Matrix3D.get_shift_matrix(0, 0, 16))
+        (screen_x, screen_y) = camera.project(Vector3D(0.2, 0.3, 15, 1))
+        hit = BVH3D(cube).pick(camera, screen_x, screen_y)
+        assert hit[0] == 4
+        (origin, direction) = camera.get_ray(screen_x, screen_y)
+        point = [origin[axis] + hit[2] * direction[axis] for axis in range(3)]
+        assert Vector3D.from_list(point + [1]).nearly_equal(Vector3D(0.2, 0.3, 15, 1))
+        assert BVH3D(cube).pick(camera, 1000, 1000) is None
+
+    def test_loaders(self):
+        cube = Models3D.get_cube_mesh()
+        tempdir = tempfile.mkdtemp()
+        try:
+            # OBJ with duplicated vertex, texture coordinates and negative index
+            filename = os.path.join(tempdir, "cube.obj")
+            with open(filename, "w") as outfile:
+                outfile.write("# cube\no cube\n")
+                for vertice in cube.vertices:
+                    outfile.write("v %f %f %f\n" % (vertice.x, vertice.y, vertice.z))
+                outfile.write("v -1 -1 -1\nvt 0 0\n")
+                for index in range(len(cube)):
+                    outfile.write("f %s\n" % " ".join(("%d/1" % (vertex + 1) for vertex in cube.get_face_indices(index))))
+                outfile.write("f -1 2 3\n")
+            mesh = Loaders3D.load_mesh(filename)
+            assert len(mesh.vertices) == 8
+            assert len(mesh) == 7
+            for index in range(len(cube)):
+                assert mesh[index].vertices == cube[index].vertices
+            assert list(mesh.get_face_indices(6)) == [0, 1, 2]
+            # STL, ascii and binary, cube as triangles
+            triangles = []
+            for index in range(len(cube)):
+                indices = cube.get_face_indices(index)
+                triangles.append((indices[0], indices[1], indices[2]))
+                triangles.append((indices[0], indices[2], indices[3]))
+            filename = os.path.join(tempdir, "cube.stl")
+            with open(filename, "w") as outfile:
+                outfile.write("solid cube\n")
+                for triangle in triangles:
+                    outfile.write(" facet normal 0 0 0\n  outer loop\n")
+                    for index in triangle:
+                        vertice = cube.vertices[index]
+                        outfile.write("   vertex %f %f %f\n" % (vertice.x, vertice.y, vertice.z))
+                    outfile.write("  endloop\n endfacet\n")
+                outfile.write("endsolid cube\n")
+            ascii_mesh = Loaders3D.load_mesh(filename)
+            with open(filename, "wb") as outfile:
+                outfile.write(b"solid binary".ljust(80))
+                outfile.write(struct.pack("<I", len(triangles)))
+                for triangle in triangles:
+                    values = [0.0, 0.0, 0.0]
+                    for index in triangle:
+                        values.extend(cube.vertices[index][:3])
+                    outfile.write(struct.pack("<12fH", *(values + [0])))
+            assert Loaders3D.is_binary_stl(filename)
+            binary_mesh = Loaders3D.load_stl(filename)
+            for mesh in (ascii_mesh, binary_mesh):
+                assert len(mesh.vertices) == 8
+                assert len(mesh) == 12
+                assert mesh.get_bounding_box() == cube.get_bounding_box()
+            assert ascii_mesh.vertices == binary_mesh.vertices
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_mesh_cache(self):
+        cube = Models3D.get_cube_mesh()
+        tempdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tempdir, "cube.cache")
+            MeshCache3D.save_mesh_cache(cube, filename)
+            mesh = MeshCache3D.load_mesh_cache(filename)
+            assert mesh.vertices == cube.vertices
+            assert list(mesh.indices) == list(cube.indices)
+            assert list(mesh.offsets) == list(cube.offsets)
+            for face, cached_face in zip(cube, mesh):
+                assert face.vertices == cached_face.vertices
+            m = Matrix3D.get_rot_x_matrix(0.5)
+            assert mesh.transform(m).vertices == cube.transform(m).vertices
+            assert mesh.get_bounding_box() == cube.get_bounding_box()
+            assert mesh.get_depth_keys() == cube.get_depth_keys()
+            # writing is copy on write, file is untouched
+            mesh.set_vertex(0, Vector3D(5, 5, 5, 1))
+            assert MeshCache3D.load_mesh_cache(filename).vertices == cube.vertices
+            with open(filename, "r+b") as outfile:
+                outfile.write(b"NOMESH")
+            self.assertRaises(ValueError, MeshCache3D.load_mesh_cache, filename)
+            # cache file next to source file
+            source = os.path.join(tempdir, "cube.obj")
+            with open(source, "w") as outfile:
+                outfile.write("v 0 0 0\nv 1 0 0\nv 0 1 0\nf 1 2 3\n")
+            mesh = MeshCache3D.load_mesh_cached(source)
+            assert os.path.exists(source + ".cache")
+            assert MeshCache3D.load_mesh_cached(source).vertices == mesh.vertices
+        finally:
+            shutil.rmtree(tempdir)
+
+    def test_sphere_mesh(self):
+        mesh = Models3D.get_sphere_mesh(12, 6, 2.0)
+        assert len(mesh.vertices) == 12 * 5 + 2
+        assert len(mesh) == 12 * 6
+        for vertice in mesh.vertices:
+            assert abs(vertice.length() - 2.0) < 0.0001
+        # normals point outwards, away from center
+        for normal, face in zip(mesh.get_face_normals(), mesh):
+            center = [sum((vertice[axis] for vertice in face)) for axis in range(3)]
+            assert sum((normal[axis] * center[axis] for axis in range(3))) > 0
+
+    def test_vertex_normals(self):
+        square = Face3D([Vector3D(0, 0, 0), Vector3D(2, 0, 0), Vector3D(2, 1, 0), Vector3D(0, 1, 0)])
+        assert square.get_area() == 2.0
+        assert square.get_normal_new() == (0.0, 0.0, 1.0, 1.0)
+        assert square.get_normal() == square.normal
+        cube = Models3D.get_cube_mesh()
+        (faces, vertex_offsets) = cube.get_vertex_faces()
+        # every corner of a cube touches three faces
+        assert all((vertex_offsets[index + 1] - vertex_offsets[index] == 3 for index in range(len(cube.vertices))))
+        assert cube.transform(Matrix3D.get_shift_matrix(1, 2, 3)).get_vertex_faces() is cube.get_vertex_faces()
+        mesh = Models3D.get_sphere_mesh(16, 8)
+        normals = mesh.get_vertex_normals()
+        assert len(normals) == len(mesh.vertices)
+        # normals of a sphere point away from its center
+        for (normal, vertice) in zip(normals, mesh.vertices):
+            assert abs(math.sqrt(sum((value * value for value in normal))) - 1.0) < 1e-9
+            assert Vector3D(normal[0], normal[1], normal[2], 1).dot3(vertice.normalized()) > 0.98
+        # incremental update gives same result as calculation from scratch
+        mesh.set_vertex(20, mesh.vertices[20] * 1.5)
+        mesh.vertices[40] = mesh.vertices[40] * 0.5
+        mesh.update_vertex_normals([40])
+        fresh = Mesh3D.from_indexed(mesh.vertices.copy(), mesh.indices, mesh.offsets)
+        assert mesh.get_vertex_normals() == fresh.get_vertex_normals()
+        # returned lists are not changed by later updates
+        normals = mesh.get_vertex_normals()
+        mesh.set_vertex(20, mesh.vertices[20] * 2)
+        assert mesh.get_vertex_normals() != normals
+        assert normals == fresh.get_vertex_normals()
+        assert mesh.get_vertex_normals() != Models3D.get_sphere_mesh(16, 8).get_vertex_normals()
+
+    def test_parallel_transform(self):
+        mesh = Models3D.get_sphere_mesh(16, 8)
+        matrix = Matrix3D.get_rot_y_matrix(0.3).dot(Matrix3D.get_shift_matrix(1.0, 2.0, 3.0))
+        expected = mesh.transform(matrix)
+        # resolve applies pending transformation at once
+        lazy = mesh.transform(matrix)
+        assert lazy.resolve() is lazy
+        assert lazy.get_pending_matrix() is None
+        assert lazy.vertices == expected.vertices
+        with ParallelTransformer(processes=2, min_vertices=10) as transformer:
+            # pool and shared array are used, not the serial fallback
+            assert transformer.is_parallel(len(mesh.vertices))
+            transformed = transformer.transform(mesh, matrix)
+            assert transformed.get_pending_matrix() is None
+            assert transformed.vertices == expected.vertices
+            assert transformed.get_bounding_box() == expected.get_bounding_box()
+            # larger mesh, pool and shared array are created again
+            large = Models3D.get_sphere_mesh(32, 16)
+            assert transformer(large.vertices, matrix) == large.transform(matrix).vertices
+            assert transformer(mesh.vertices, matrix) == expected.vertices
+            # small meshes stay serial
+            assert not transformer.is_parallel(9)
+
+    def test_backend(self):
+        self.assertRaises(ValueError, Backend3D.set_backend, "fortran")
+        if Backend3D.numpy is None:
+            self.skipTest("numpy not installed")
+        backend = Backend3D.get_backend()
+        camera = Camera3D((300, 300))
+        # vertices at z = 1.5 are projected to z = 0
+        plane = Camera3D((0, 0), near=1.0, far=3.0, position=(0.0, 0.0, 0.0))
+        matrix = Matrix3D.get_shift_matrix(11.0, 0.0, 30.0).dot(Matrix3D.get_rot_y_matrix(0.7))
+        results = []
+        try:
+            for name in Backend3D.BACKENDS:
+                Backend3D.set_backend(name)
+                mesh = Models3D.get_sphere_mesh(12, 6).transform(matrix)
+                assert Backend3D.is_numpy(mesh.vertices) == (name == "numpy")
+                special = Mesh3D.from_face_indices([Vector3D(float("inf"), -0.0, 1.5, 1.0), Vector3D(0.0, -0.0, 1.5, 1.0), Vector3D(1.0, 1.0, 1.0, 1.0)], [(0, 1, 2)])
+                results.append((
+                    list(mesh.vertices),
+                    mesh.get_face_normals(),
+                    mesh.cull(camera),
+                    mesh.cull_backfaces(camera.get_eye(), [0, 3, 5]),
+                    list(camera.get_outcodes(mesh.vertices)),
+                    camera.project_many(mesh.vertices),
+                    camera.project_many_depth(mesh.vertices),
+                    # signs of zeros and infinite values, see Vector3D.__repr__
+                    repr(list(special.vertices.transform(Matrix3D.get_shift_matrix(1, 2, 3)))),
+                    repr(list(special.vertices.transform(Matrix3D.get_rot_z_matrix(0.5)))),
+                    repr(plane.project_many_depth(special.vertices)),
+                    repr((special.get_face_normals(), special.cull(camera))),
+                    mesh.get_vertex_normals(),
+                    mesh.get_depth_keys(),
+                    mesh.get_depth_keys(camera.get_view_matrix()),
+                    mesh.sort_faces(camera.get_view_matrix()),
+                    repr(BoundingBox3D.from_vertices(mesh.vertices)),
+                    BoundingSphere3D.from_vertices(mesh.vertices).radius,
+                    list(BVH3D(mesh).data),
+                    Backend3D.as_array(mesh.vertices)))
+                # incremental update after first calculation
+                mesh.set_vertex(7, mesh.vertices[7] * 1.5)
+                results[-1] += (mesh.get_vertex_normals(), )
+                # projected z of 0
+                self.assertRaises(ZeroDivisionError, plane.project_many, special.vertices)
+        finally:
+            Backend3D.set_backend(backend)
+        # same results, not only nearly equal
+        assert results[0] == results[1]
+        assert 0 < len(results[0][2]) < len(results[0][1])
+
+    def test_animation(self):
+        directory = tempfile.mkdtemp()
+        try:
+            transformations = Animation3D.get_turntable(6)
+            filenames = Animation3D.render_animation(Models3D.get_cube_mesh(), transformations, directory, 32, 18, processes=1)
+            assert filenames == [os.path.join(directory, Animation3D.FILENAME % index) for index in range(6)]
+            for (index, filename) in enumerate(filenames):
+                framebuffer = Rasterizer3D.FrameBuffer(32, 18)
+                mesh = Models3D.get_cube_mesh().transform(transformations[index])
+                Rasterizer3D.render_mesh(framebuffer, mesh, Camera3D((0, 0), viewport=(16.0, 9.0)))
+                with open(filename, "rb") as infile:
+                    assert infile.read() == framebuffer.to_ppm()
+            # worker processes render the same frames
+            parallel = os.path.join(directory, "parallel")
+            parallel_filenames = Animation3D.render_animation(Models3D.get_cube_mesh(), transformations, parallel, 32, 18, processes=2)
+            assert parallel_filenames == [os.path.join(parallel, Animation3D.FILENAME % index) for index in range(6)]
+            for (filename, parallel_filename) in zip(filenames, parallel_filenames):
+                with open(filename, "rb") as infile, open(parallel_filename, "rb") as parallel_file:
+                    assert infile.read() == parallel_file.read()
+        finally:
+            shutil.rmtree(directory)
+
+    def test_scene(self):
+        scene = Scene3D()
+        cube = Models3D.get_cube_mesh()
+        arm = scene.add(Node3D(Matrix3D.get_shift_matrix(0, 0, 20), name="arm"))
+        hand = arm.add(Node3D(Matrix3D.get_rot_y_matrix(0.5), cube, name="hand"))
+        static = scene.add(Node3D(Matrix3D.get_shift_matrix(5, 0, 20), cube, name="static"))
+        assert [node.name for node in scene.walk()] == ["root", "arm", "hand", "static"]
+        expected = Matrix3D.get_shift_matrix(0, 0, 20).dot(Matrix3D.get_rot_y_matrix(0.5))
+        assert hand.get_world_matrix() == expected
+        static_mesh = static.get_world_mesh()
+        assert not any((node.is_dirty() for node in scene.walk()))
+        # changing a parent marks only its subtree
+        arm.matrix = Matrix3D.get_shift_matrix(0, 1, 20)
+        assert arm.is_dirty() and hand.is_dirty()
+        assert not static.is_dirty()
+        assert static.get_world_mesh() is static_mesh
+        # changed mesh is transformed again
+        cube.set_vertex(0, cube.vertices[0] * 2)
+        assert static.get_world_mesh() is not static_mesh
+        assert static.get_world_mesh().vertices == cube.transform(static.get_world_matrix()).vertices
+        expected = Matrix3D.get_shift_matrix(0, 1, 20).dot(Matrix3D.get_rot_y_matrix(0.5))
+        assert hand.get_world_matrix() == expected
+        assert hand.get_world_mesh().vertices == cube.transform(expected).vertices
+        # moving a subtree
+        static.add(hand)
+        assert arm.children == []
+        assert hand.get_world_matrix() == Matrix3D.get_shift_matrix(5, 0, 20).dot(Matrix3D.get_rot_y_matrix(0.5))
+        meshes = scene.get_world_meshes()
+        assert [node.name for (node, mesh) in meshes] == ["static", "hand"]
+        visible = scene.cull(Camera3D((0, 0)))
+        assert len(visible) == 2
+
+    def test_profiler(self):
+        camera = Camera3D((0, 0))
+        mesh = Models3D.get_cube_mesh().transform(Matrix3D.get_shift_matrix(0, 0, 20))
+        # disabled, nothing is collected
+        mesh.vertices
+        assert Profiler3D.end_frame() is None
+        Profiler3D.enable()
+        try:
+            for _ in range(2):
+                Profiler3D.begin_frame()
+                mesh = Models3D.get_cube_mesh().transform(Matrix3D.get_shift_matrix(0, 0, 20))
+                visible = mesh.cull(camera)
+                camera.project_many(mesh.vertices)
+                frame = Profiler3D.end_frame()
+        finally:
+            Profiler3D.disable()
+        assert frame["frame"] == 1
+        assert frame["counters"]["vertices_transformed"] == 8
+        assert frame["counters"]["vertices_projected"] == 8
+        assert frame["counters"]["faces_culled"] == 6 - len(visible)
+        assert frame["stages"]["cull"]["calls"] == 1
+        assert frame["stages"]["transform"]["seconds"] >= 0.0
+        totals = Profiler3D.get_totals()
+        assert totals["frames"] == 2
+        assert totals["counters"]["vertices_projected"] == 16
+        assert json.loads(Profiler3D.dump_json())["totals"] == totals
+
+    def test_frame_benchmark_compare(self):
+        baseline = {"presets": {"cube": {"frame_ms": 10.0}, "cubes": {"frame_ms": 100.0}}}
+        results = {"presets": {"cube": {"frame_ms": 10.5}, "cubes": {"frame_ms": 109.0}, "mesh": {"frame_ms": 1.0}}}
+        # within tolerance, mesh is missing in baseline and ignored
+        assert frame_benchmark.compare(results, baseline, 0.1) == [
+            ("cube", 10.0, 10.5, False),
+            ("cubes", 100.0, 109.0, False)]
+        # past tolerance
+        results["presets"]["cubes"]["frame_ms"] = 111.0
+        assert frame_benchmark.compare(results, baseline, 0.1) == [
+            ("cube", 10.0, 10.5, False),
+            ("cubes", 100.0, 111.0, True)]
+        assert [regression for (_, _, _, regression) in frame_benchmark.compare(results, baseline, 0.01)] == [True, True]
+        assert frame_benchmark.compare(results, {}) == []
+
     def test_m_transforms(self):
         v = Vector3D(1, 1, 0, 1)
         m = Matrix3D.get_shift_matrix(5, 5, 0)
@@ -5,17 +5,24 @@ import math
 import unittest
 
 class Vector3D(object):
-    """Vector in R³ with homogeneous part h"""
+    """
+    Vector in R³ with homogeneous part h
+
+    x, y, z and h are the only state, stored in __slots__,
+    so there is no __dict__ per instance, index access like
+    vector[0] reads the same attributes
+    """
+
+    __slots__ = ("x", "y", "z", "h")
 
     def __init__(self, x, y, z, h=1):
         """
         3D coordinates given with x, y, z, homgeneous part is optinals, defaults to 1
         """
-        self.__data = [x, y, z, h]
-        self.x = self.__data[0]
-        self.y = self.__data[1]
-        self.z = self.__data[2]
-        self.h = self.__data[3]
+        self.x = x
+        self.y = y
+        self.z = z
+        self.h = h
 
     @classmethod
     def from_list(cls, data):
@@ -24,7 +31,10 @@ class Vector3D(object):
 
     def __eq__(self, other):
         """test equality"""
-        return all((self[index] == other[index] for index in range(4)))
+        return self.x == other[0] and self.y == other[1] and self.z == other[2] and self.h == other[3]
+
+    def __ne__(self, other):
+        return not self == other
 
     def nearly_equal(self, other):
         """
@@ -34,42 +44,42 @@ class Vector3D(object):
         """
         return all((abs(self[index] - other[index]) < 0.0001 for index in range(4)))
 
-    def __getitem__(self, key):
-        return self.__data[key]
-
-    def __richcmp__(self, other, method):
-        if method == 0: # < __lt__
-            pass
-        elif method == 2: # == __eq__
-            return self.x == other.x and self.y == other.y and self.z == other.z and self.h == other.h
-        elif method == 4: # > __gt__
-            pass
-        elif method == 1: # <= lower_equal
-            pass
-        elif method == 3: # != __ne__
-            return self.x != other.x or self.y != other.y or self.z != other.z or self.h != other.h
-        elif method == 5: # >= greater equal
-            pass
-
     def __len__(self):
         """list interface"""
         return 4
 
     def __getitem__(self, key):
         """list interface"""
-        return self.__data[key]
+        if key == 0:
+            return self.x
+        elif key == 1:
+            return self.y
+        elif key == 2:
+            return self.z
+        elif key == 3:
+            return self.h
+        # negative indices and slices
+        return (self.x, self.y, self.z, self.h)[key]
 
     def __setitem__(self, key, value):
         """list interface"""
-        self.__data[key] = value
+        setattr(self, self.__slots__[key], value)
+
+    def __iter__(self):
+        """list interface, allows unpacking like x, y, z, h = vector"""
+        return iter((self.x, self.y, self.z, self.h))
+
+    def __reduce__(self):
+        """pickle support, classes with __slots__ have no __dict__ to pickle"""
+        return (self.__class__, (self.x, self.y, self.z, self.h))
 
     def __repr__(self):
         """object representation"""
-        return "Vector3D(%(x)f, %(y)f, %(z)f, %(h)f)" % self.__dict__
+        return "Vector3D(%f, %f, %f, %f)" % (self.x, self.y, self.z, self.h)
 
     def __str__(self):
         """string output"""
-        return "[%(x)f, %(y)f, %(z)f, %(h)f]" % self.__dict__
+        return "[%f, %f, %f, %f]" % (self.x, self.y, self.z, self.h)
 
     def __add__(self, other):
         """
@@ -122,22 +132,68 @@ class Vector3D(object):
         self.z *= scalar
         return self
 
-    def __div__(self, scalar):
+    def __truediv__(self, scalar):
         """
         division with scalar
         ignores homogeneous part
         """
         return Vector3D(self.x / scalar, self.y / scalar, self.z / scalar, self.h)
+    __div__ = __truediv__
 
-    def __idiv__(self, scalar):
+    def __itruediv__(self, scalar):
         """
-        vector addition with another Vector class
+        division with scalar inplace
         ignores homogeneous part
         """
         self.x /= scalar
         self.y /= scalar
         self.z /= scalar
         return self
+    __idiv__ = __itruediv__
+
+    @staticmethod
+    def add_into(out, vector1, vector2):
+        """
+        out = vector1 + vector2, without creating a new object
+        out may be vector1 or vector2, returns out
+        """
+        out.x = vector1.x + vector2.x
+        out.y = vector1.y + vector2.y
+        out.z = vector1.z + vector2.z
+        out.h = vector1.h
+        return out
+
+    @staticmethod
+    def sub_into(out, vector1, vector2):
+        """out = vector1 - vector2, like add_into"""
+        out.x = vector1.x - vector2.x
+        out.y = vector1.y - vector2.y
+        out.z = vector1.z - vector2.z
+        out.h = vector1.h
+        return out
+
+    @staticmethod
+    def mul_into(out, vector, scalar):
+        """out = vector * scalar, like add_into"""
+        out.x = vector.x * scalar
+        out.y = vector.y * scalar
+        out.z = vector.z * scalar
+        out.h = vector.h
+        return out
+
+    @staticmethod
+    def cross_into(out, vector1, vector2):
+        """
+        out = vector1.cross(vector2), like add_into
+        out may be vector1 or vector2
+        """
+        (x1, y1, z1) = (vector1.x, vector1.y, vector1.z)
+        (x2, y2, z2) = (vector2.x, vector2.y, vector2.z)
+        out.x = y1 * z2 - z1 * y2
+        out.y = z1 * x2 - x1 * z2
+        out.z = x1 * y2 - y1 * x2
+        out.h = vector1.h
+        return out
 
     def length(self):
         """return length of vector"""
@@ -229,11 +285,10 @@ class Vector3D(object):
         """
         return (self.x / self.z + shift_vec[0], self.y / self.z + shift_vec[1])
 
-    def project(win_width, win_height, fov, viewer_distance):
+    def project(self, win_width, win_height, fov, viewer_distance):
         """
-        project some vector (vec1) to 2D Screen
+        project self to 2D Screen
 
-        vec1 - vector to project
         win_width - width of window
         win_height - height of screen
         fov - field of view
@@ -271,7 +326,9 @@ class TestClass(unittest.TestCase):
         m2 =  m2 - m1
         assert m2 == m1
         m1 *= 2
-        print m1.normalized()
+        assert m1 == Vector3D(2, 2, 2, 1)
+        m1 /= 2
+        assert m1 == Vector3D(1, 1, 1, 1)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,133 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from array import array
+# own modules
+from Vector3D import Vector3D as Vector3D
+
+class VertexArray(object):
+    """
+    compact storage of many vertices in one flat buffer
+
+    x, y, z, h of every vertex are stored contiguously in a
+    array.array("d"), so every vertex costs 32 bytes and no python object
+    at all, Vector3D objects are only created if some vertex is accessed
+
+    | x0 | y0 | z0 | h0 | x1 | y1 | z1 | h1 | ...
+    """
+
+    def __init__(self, data=None):
+        """
+        data is a flat buffer of x, y, z, h floats,
+        defaults to a new empty array.array("d")
+        """
+        if data is None:
+            data = array("d")
+        assert len(data) % 4 == 0
+        self.data = data
+
+    @classmethod
+    def from_vectors(cls, vectors):
+        """create class from iterable of Vector3D objects"""
+        data = array("d")
+        for vector in vectors:
+            data.extend((vector[0], vector[1], vector[2], vector[3]))
+        return cls(data)
+
+    @classmethod
+    def zeros(cls, length):
+        """return preallocated VertexArray of length vertices, all zero"""
+        return cls(array("d", [0.0]) * (4 * length))
+
+    def __len__(self):
+        """number of vertices, not floats"""
+        return len(self.data) // 4
+
+    def __getitem__(self, key):
+        """
+        return Vector3D object of vertex at index key,
+        or new VertexArray if key is a slice
+        """
+        data = self.data
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step == 1:
+                return VertexArray(data[4 * start:4 * stop])
+            return self.take(range(start, stop, step))
+        if key < 0:
+            key += len(self)
+        index = 4 * key
+        if not 0 <= index < len(data):
+            raise IndexError("VertexArray index out of range")
+        return Vector3D(data[index], data[index + 1], data[index + 2], data[index + 3])
+
+    def __setitem__(self, key, vector):
+        """store x, y, z, h of vector at vertex index key"""
+        if key < 0:
+            key += len(self)
+        index = 4 * key
+        if not 0 <= index < len(self.data):
+            raise IndexError("VertexArray index out of range")
+        self.data[index:index + 4] = array("d", (vector[0], vector[1], vector[2], vector[3]))
+
+    def __iter__(self):
+        """iterate over Vector3D objects, created on the fly"""
+        data = self.data
+        for index in range(0, len(data), 4):
+            yield Vector3D(data[index], data[index + 1], data[index + 2], data[index + 3])
+
+    def __eq__(self, other):
+        """test equality"""
+        return len(self) == len(other) and all((vec1 == vec2 for vec1, vec2 in zip(self, other)))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def nearly_equal(self, other):
+        """test nearly equality, see Vector3D.nearly_equal"""
+        return len(self) == len(other) and all((vec1.nearly_equal(vec2) for vec1, vec2 in zip(self, other)))
+
+    def __repr__(self):
+        """object representation"""
+        return "VertexArray.from_vectors([%s])" % ", ".join((repr(vector) for vector in self))
+
+    def __str__(self):
+        """string output"""
+        return "[%s]" % ", ".join((str(vector) for vector in self))
+
+    def append(self, vector):
+        """append x, y, z, h of vector"""
+        self.data.extend((vector[0], vector[1], vector[2], vector[3]))
+
+    def extend(self, vectors):
+        """append every vector of vectors"""
+        if isinstance(vectors, VertexArray):
+            self.data.extend(vectors.data)
+        else:
+            for vector in vectors:
+                self.append(vector)
+
+    def take(self, indices):
+        """return new VertexArray with vertices at indices, in this order"""
+        data = self.data
+        new_data = array("d")
+        extend = new_data.extend
+        for index in indices:
+            index *= 4
+            extend(data[index:index + 4])
+        return VertexArray(new_data)
+
+    def copy(self):
+        """return copy of self, with copied buffer"""
+        return VertexArray(array("d", self.data))
+
+    def transform(self, matrix):
+        """return new VertexArray with matrix applied to every vertex"""
+        ret_array = VertexArray.zeros(len(self))
+        matrix.transform_into(self.data, ret_array.data)
+        return ret_array
+
+    def transform_inplace(self, matrix):
+        """apply matrix to every vertex, overwrites self"""
+        matrix.transform_into(self.data, self.data)
+        return self
@@ -0,0 +1,182 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+microbenchmarks of the hot paths of Vector3D, Matrix3D, Face3D and Mesh3D
+
+every benchmark is run in batches until at least --min-time seconds
+are spent, the result is written as JSON to stdout or --output
+
+per benchmark, see COLUMNS, which is written to the output too
+ops_per_sec             : calls per second
+ns_per_op               : nanoseconds per call
+retained_objects_per_op : garbage collected objects still alive after one call,
+                          mostly the returned object(s), from gc counters,
+                          freed temporaries are not counted
+peak_bytes_per_op       : peak memory allocated during one call, temporaries
+                          included, needs tracemalloc (python 3.4+), so
+                          always null with python 2.7
+"""
+
+import gc
+import sys
+import json
+import math
+import time
+import timeit
+import platform
+import argparse
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+# own modules
+import Models3D
+from Vector3D import Vector3D as Vector3D
+from Matrix3D import Matrix3D as Matrix3D
+from Face3D import Face3D as Face3D
+
+# approximate number of mesh vertices for Mesh3D benchmarks
+MESH_SIZES = (100, 1000, 10000)
+# minimum time in seconds per benchmark
+MIN_TIME = 0.2
+# number of calls to count retained objects
+RETAINED_CALLS = 100
+# description of measured values, written to output
+COLUMNS = {
+    "ops_per_sec": "calls per second",
+    "ns_per_op": "nanoseconds per call",
+    "retained_objects_per_op": "gc tracked objects still alive after one call, freed temporaries not counted",
+    "peak_bytes_per_op": "peak bytes allocated during one call, python 3.4+ only (tracemalloc), else null",
+}
+
+def _timeit(func, min_time):
+    """
+    call func in batches, double batch size until batch takes min_time
+    returns tuple (number of calls, seconds)
+    """
+    number = 1
+    while True:
+        timer = timeit.default_timer
+        start = timer()
+        for _ in range(number):
+            func()
+        elapsed = timer() - start
+        if elapsed >= min_time:
+            return (number, elapsed)
+        number *= 2
+
+def _retained_objects(func):
+    """
+    number of gc tracked objects per call still alive afterwards,
+    gc is disabled meanwhile, so the generation 0 counter is
+    allocations minus deallocations
+    """
+    results = [None] * RETAINED_CALLS
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        gc.collect()
+        before = gc.get_count()[0]
+        for index in range(RETAINED_CALLS):
+            results[index] = func()
+        after = gc.get_count()[0]
+    finally:
+        if enabled:
+            gc.enable()
+    return max(after - before, 0) / float(RETAINED_CALLS)
+
+def _peak_bytes(func):
+    """peak traced memory of one call in bytes, None without tracemalloc"""
+    if tracemalloc is None:
+        return None
+    func()
+    tracemalloc.start()
+    try:
+        (baseline, _) = tracemalloc.get_traced_memory()
+        result = func()
+        (_, peak) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak - baseline
+
+def bench(name, func, params=None, min_time=MIN_TIME):
+    """run one benchmark and return result dictionary"""
+    (number, elapsed) = _timeit(func, min_time)
+    return {
+        "name": name,
+        "params": params or {},
+        "number": number,
+        "seconds": elapsed,
+        "ops_per_sec": number / elapsed,
+        "ns_per_op": elapsed / number * 1e9,
+        "retained_objects_per_op": _retained_objects(func),
+        "peak_bytes_per_op": _peak_bytes(func),
+    }
+
+def get_benchmarks(mesh_sizes=MESH_SIZES):
+    """return list of tuples (name, func, params)"""
+    vector1 = Vector3D(1.0, 2.0, 3.0, 1.0)
+    vector2 = Vector3D(-4.0, 0.5, 2.0, 1.0)
+    matrix1 = Matrix3D.get_rot_y_matrix(0.5).dot(Matrix3D.get_rot_x_matrix(0.3))
+    matrix2 = Matrix3D.get_shift_matrix(1.0, 2.0, 3.0).dot(Matrix3D.get_scale_matrix(2.0, 2.0, 2.0))
+    face = Face3D([
+        Vector3D(-1.0, -1.0, 0.0, 1.0),
+        Vector3D(1.0, -1.0, 0.0, 1.0),
+        Vector3D(1.0, 1.0, 0.0, 1.0),
+        Vector3D(-1.0, 1.0, 0.0, 1.0)])
+    benchmarks = [
+        ("Vector3D.__add__", lambda: vector1 + vector2, None),
+        ("Vector3D.__sub__", lambda: vector1 - vector2, None),
+        ("Vector3D.__mul__", lambda: vector1 * 2.0, None),
+        ("Vector3D.dot", lambda: vector1.dot(vector2), None),
+        ("Vector3D.cross", lambda: vector1.cross(vector2), None),
+        ("Vector3D.normalized", vector1.normalized, None),
+        ("Matrix3D.dot", lambda: matrix1.dot(matrix2), None),
+        ("Matrix3D.v_dot", lambda: matrix1.v_dot(vector1), None),
+        ("Matrix3D.det", matrix1.det, None),
+        ("Matrix3D.inverse", matrix1.inverse, None),
+        # transforms are lazy, reading vertices does the work
+        ("Face3D.transform", lambda: face.transform(matrix1).vertices, None),
+    ]
+    for size in mesh_sizes:
+        slices = max(int(math.sqrt(size)), 3)
+        mesh = Models3D.get_sphere_mesh(slices, slices)
+        params = {"vertices": len(mesh.vertices), "faces": len(mesh)}
+        benchmarks.append(("Mesh3D.transform", lambda mesh=mesh: mesh.transform(matrix1).vertices, params))
+    return benchmarks
+
+def run(mesh_sizes=MESH_SIZES, min_time=MIN_TIME, pattern=None):
+    """run all benchmarks with pattern in name, return JSON compatible dictionary"""
+    results = []
+    for (name, func, params) in get_benchmarks(mesh_sizes):
+        if pattern is not None and pattern not in name:
+            continue
+        results.append(bench(name, func, params, min_time))
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "min_time": min_time,
+        "columns": COLUMNS,
+        "peak_bytes_measured": tracemalloc is not None,
+        "benchmarks": results,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="microbenchmarks of python-3d-math hot paths")
+    parser.add_argument("--output", help="write JSON to file instead of stdout")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="minimum seconds per benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(MESH_SIZES), help="approximate number of vertices of Mesh3D benchmarks")
+    parser.add_argument("--filter", help="run only benchmarks with this string in name")
+    args = parser.parse_args()
+    report = json.dumps(run(args.sizes, args.min_time, args.filter), indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as outfile:
+            outfile.write(report + "\n")
+    else:
+        sys.stdout.write(report + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+headless end to end frame benchmark
+
+runs the pipeline of pygame_test.Thing.update without any display,
+for every object and frame
+transform : rotate, scale and shift Mesh3D, resolve vertices
+cull      : Mesh3D.cull, frustum and back face culling
+sort      : DepthSort3D.sort_mesh, painters algorithm
+project   : Camera3D.project_many of all unique vertices
+assemble  : collect projected points of visible faces, as for drawing
+
+presets
+cube  : one cube
+cubes : 1000 cubes in a 10 x 10 x 10 grid
+mesh  : one large sphere mesh, or the file given with --mesh
+
+results are written as JSON, with --baseline the frame time of every
+preset is compared to a stored result file, if some preset is slower
+than baseline * (1 + tolerance) the exit code is 1
+
+with --profile the stages and counters reported to Profiler3D
+by the core modules are dumped too
+"""
+
+import sys
+import json
+import math
+import time
+import timeit
+import platform
+import argparse
+# own modules
+import Models3D
+import MeshCache3D
+import Profiler3D
+from Matrix3D import Matrix3D as Matrix3D
+from Camera3D import Camera3D as Camera3D
+from DepthSort3D import DepthSort3D as DepthSort3D
+
+STAGES = ("transform", "cull", "sort", "project", "assemble")
+PRESETS = ("cube", "cubes", "mesh")
+# default number of frames per preset
+FRAMES = {"cube": 200, "cubes": 5, "mesh": 5}
+# allowed slowdown against baseline
+TOLERANCE = 0.1
+# screen size, only used for projected coordinates
+SCREEN = (600, 600)
+
+def get_scene(preset, mesh_filename=None):
+    """
+    return list of tuples (mesh, position) for preset,
+    position is a tuple (x, y, z) in front of the camera
+    """
+    if preset == "cube":
+        return [(Models3D.get_cube_mesh(), (0.0, 0.0, 20.0))]
+    elif preset == "cubes":
+        mesh = Models3D.get_cube_mesh()
+        return [
+            (mesh, (3.0 * (x - 4.5), 3.0 * (y - 4.5), 30.0 + 3.0 * z))
+            for x in range(10) for y in range(10) for z in range(10)]
+    elif preset == "mesh":
+        if mesh_filename is not None:
+            mesh = MeshCache3D.load_mesh_cached(mesh_filename)
+        else:
+            mesh = Models3D.get_sphere_mesh(128, 128)
+        # scale to a sphere of radius 4 around origin
+        sphere = mesh.get_bounding_sphere()
+        scale = 4.0 / sphere.radius if sphere.radius else 1.0
+        center = Matrix3D.get_shift_matrix(-sphere.center.x, -sphere.center.y, -sphere.center.z)
+        mesh = mesh.transform(Matrix3D.get_scale_matrix(scale, scale, scale).dot(center))
+        return [(mesh, (0.0, 0.0, 20.0))]
+    raise ValueError("unknown preset %s" % preset)
+
+def run_preset(preset, frames, mesh_filename=None):
+    """render frames of preset, return result dictionary"""
+    scene = get_scene(preset, mesh_filename)
+    camera = Camera3D((SCREEN[0] / 2, SCREEN[1] / 2), viewport=(SCREEN[0] / 4.0, SCREEN[1] / 4.0))
+    view_matrix = camera.get_view_matrix()
+    depth_sorts = [DepthSort3D() for _ in scene]
+    stages = dict(((stage, 0.0) for stage in STAGES))
+    counters = {"vertices": 0, "faces": 0, "visible_faces": 0}
+    timer = timeit.default_timer
+    start = timer()
+    for frame in range(frames):
+        Profiler3D.begin_frame()
+        angle = frame * math.pi / 180
+        rotation = Matrix3D.get_rot_z_matrix(angle).dot(Matrix3D.get_rot_x_matrix(angle))
+        for ((model, position), depth_sort) in zip(scene, depth_sorts):
+            time0 = timer()
+            mesh = model.transform(Matrix3D.get_shift_matrix(*position).dot(rotation))
+            mesh.vertices
+            time1 = timer()
+            visible = mesh.cull(camera)
+            time2 = timer()
+            order = depth_sort.sort_mesh(mesh, view_matrix, visible)
+            time3 = timer()
+            projected = camera.project_many(mesh.vertices)
+            time4 = timer()
+            polygons = [[projected[index] for index in mesh.get_face_indices(face_index)] for face_index in order]
+            time5 = timer()
+            stages["transform"] += time1 - time0
+            stages["cull"] += time2 - time1
+            stages["sort"] += time3 - time2
+            stages["project"] += time4 - time3
+            stages["assemble"] += time5 - time4
+            counters["vertices"] += len(mesh.vertices)
+            counters["faces"] += len(mesh)
+            counters["visible_faces"] += len(polygons)
+        Profiler3D.end_frame()
+    elapsed = timer() - start
+    frames = max(frames, 1)
+    return {
+        "objects": len(scene),
+        "frames": frames,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed else None,
+        "frame_ms": 1000.0 * elapsed / frames,
+        "stage_ms": dict(((stage, 1000.0 * value / frames) for (stage, value) in stages.items())),
+        "per_frame": dict(((name, value / float(frames)) for (name, value) in counters.items())),
+    }
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    compare frame times of results against baseline results,
+    presets missing in one of them are ignored
+    returns list of tuples (preset, baseline frame_ms, frame_ms, regression)
+    """
+    comparison = []
+    for (preset, result) in sorted(results["presets"].items()):
+        base = baseline.get("presets", {}).get(preset)
+        if base is None:
+            continue
+        regression = result["frame_ms"] > base["frame_ms"] * (1.0 + tolerance)
+        comparison.append((preset, base["frame_ms"], result["frame_ms"], regression))
+    return comparison
+
+def main():
+    parser = argparse.ArgumentParser(description="headless end to end frame benchmark")
+    parser.add_argument("presets", nargs="*", default=list(PRESETS), help="presets to run, %s" % ", ".join(PRESETS))
+    parser.add_argument("--frames", type=int, help="number of frames for every preset, default depends on preset")
+    parser.add_argument("--mesh", help="OBJ or STL file for preset mesh, instead of sphere")
+    parser.add_argument("--output", help="write JSON results to file instead of stdout")
+    parser.add_argument("--baseline", help="JSON results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed slowdown against baseline, 0.1 is 10 percent")
+    parser.add_argument("--profile", help="enable Profiler3D and write its JSON dump of the last preset to file")
+    parser.add_argument("--trace-memory", action="store_true", help="record traced memory per frame with --profile")
+    args = parser.parse_args()
+    results = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "presets": {},
+    }
+    for preset in args.presets:
+        frames = args.frames if args.frames is not None else FRAMES[preset]
+        if args.profile:
+            Profiler3D.enable(args.trace_memory)
+        results["presets"][preset] = run_preset(preset, frames, args.mesh)
+    if args.profile:
+        Profiler3D.disable()
+        Profiler3D.dump_json(args.profile)
+    report = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as outfile:
+            outfile.write(report + "\n")
+    else:
+        sys.stdout.write(report + "\n")
+    if args.baseline:
+        with open(args.baseline, "r") as infile:
+            baseline = json.load(infile)
+        failed = False
+        for (preset, base_ms, frame_ms, regression) in compare(results, baseline, args.tolerance):
+            sys.stderr.write("%-6s baseline %10.3f ms  current %10.3f ms  %+7.1f%%  %s\n" % (
+                preset, base_ms, frame_ms, 100.0 * (frame_ms / base_ms - 1.0), "REGRESSION" if regression else "ok"))
+            failed = failed or regression
+        if failed:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ import Models3D
 from Mesh3D import Mesh3D as Mesh3D
 from Vector3D import Vector3D as Vector3D
 from Matrix3D import Matrix3D as Matrix3D
+from Camera3D import Camera3D as Camera3D
+from DepthSort3D import DepthSort3D as DepthSort3D
 
 # in german Blickwinkel,
 # according to wikipedia, for console games played on TV 60degrees
@@ -47,6 +49,8 @@ class Thing(object):
         self.x_axis = Vector3D(100.0, 0.0, 0.0, 1)
         self.y_axis = Vector3D(0.0, 100.0, 0.0, 1)
         self.z_axis = Vector3D(0.0, 0.0, 100.0, 1)
+        self.camera = Camera3D(self.center, fov=FOV, aspect_ratio=ASPECT_RATIO, near=near, far=far)
+        self.depth_sort = DepthSort3D()
 
     def update(self):
         """
@@ -57,52 +61,31 @@ class Thing(object):
 
         finally painting on surface is called
         """
+        # camera matrices are only recalculated if some value changed
+        self.camera.fov = FOV
+        self.camera.x_angle = X_ANGLE
+        self.camera.y_angle = Y_ANGLE
         # Clock vector
         vector = Matrix3D.get_rot_z_matrix(self.angle).v_dot(self.vector)
         # projected = self.__project(self.vector, self.center)
-        projected = self.__projectm(vector, self.center)
+        projected = self.camera.project(vector)
         pygame.draw.polygon(self.surface, pygame.Color(255,255,255,0), (self.center, projected), 1)
         # Cube
         mesh = self.model.transform(Matrix3D.get_rot_z_matrix(self.angle))
         #mesh = mesh.transform(Matrix3D.get_rot_x_matrix(self.angle))
         mesh = mesh.transform(Matrix3D.get_scale_matrix(SCALE, SCALE, SCALE))
         mesh = mesh.transform(Matrix3D.get_shift_matrix(X_SHIFT, Y_SHIFT, Z_SHIFT))
-        for face in mesh:
-            vertices = [self.__projectm(vertice, self.center) for vertice in face]
+        # paint back to front
+        for face_index in self.depth_sort.sort_mesh(mesh, self.camera.get_view_matrix()):
+            vertices = self.camera.project_many(mesh.get_face(face_index).vertices)
             pygame.draw.polygon(self.surface, pygame.Color(255,255,255,0), vertices, 1)
         self.angle += self.angle_step
         # axis vectors
-        pygame.draw.polygon(self.surface, pygame.Color(255,0,0,0), (self.center, self.__projectm(self.x_axis, self.center)), 1)
-        pygame.draw.polygon(self.surface, pygame.Color(0,255,0,0), (self.center, self.__projectm(self.y_axis, self.center)), 1)
-        pygame.draw.polygon(self.surface, pygame.Color(0,0,255,0), (self.center, self.__projectm(self.z_axis, self.center)), 1)
+        (x_axis, y_axis, z_axis) = self.camera.project_many((self.x_axis, self.y_axis, self.z_axis))
+        pygame.draw.polygon(self.surface, pygame.Color(255,0,0,0), (self.center, x_axis), 1)
+        pygame.draw.polygon(self.surface, pygame.Color(0,255,0,0), (self.center, y_axis), 1)
+        pygame.draw.polygon(self.surface, pygame.Color(0,0,255,0), (self.center, z_axis), 1)
 
-    @staticmethod
-    def __projectm(vector, center):
-        """
-        apply 
-        clipping matrix
-        camera transformation matrix
-        camera rotation matrix
-
-        TODO: finally sort out vertices out of clipping area
-
-        and return tuple on 2D Coordinates
-        taken from : http://stackoverflow.com/questions/724219/how-to-convert-a-3d-point-into-2d-perspective-projection
-        """
-        clipping_m = Matrix3D([
-            [FOV * ASPECT_RATIO, 0.0, 0.0                            , 0.0],
-            [0.0               , FOV, 0.0                            , 0.0],
-            [0.0               , 0.0, (far + near) / (far-near)      , (2.0 * near * far) / (near-far)],
-            [0.0               , 0.0, 1.0                            , 0.0]
-        ])
-        cam_translation_m = Matrix3D.get_shift_matrix(0, 0, -10)
-        cam_rot_m = Matrix3D.get_rot_y_matrix(Y_ANGLE).dot(Matrix3D.get_rot_x_matrix(X_ANGLE))
-        # mind the order !!
-        new_vector = clipping_m.dot(cam_translation_m.dot(cam_rot_m)).v_dot(vector)
-        new_x = center[0] + new_vector.x * 16.0 / ( 2.0 * new_vector.z) + 8.0
-        new_y = center[1] + new_vector.y * 9.0 / ( 2.0 * new_vector.z) + 4.5
-        return new_x, new_y
- 
     @staticmethod
     def __project(vector, shift_tuple, fov=FOV, viewer_distance=VIEWER_DISTANCE):
         factor = fov / (viewer_distance + vector[2])